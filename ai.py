@@ -1,26 +1,127 @@
+import copy
 import sys
+import threading
+import time
 from random import randrange
 
-from pieces.bishop import Bishop
-from pieces.knight import Knight
-from pieces.pawn import Pawn
+import bitboard
+import evaluation
+import mobility
+import ordering
+import stats
+import transposition
+from bitboard import Bitboard
 from pieces.piece import Color
 
+# Board backends the search may run on.
+# BOARD searches chess.Chess directly, BITBOARD searches a bitboard.Bitboard copy of it.
+BOARD = "board"
+BITBOARD = "bitboard"
+
+# Results of previous searches, keyed by chess.Chess.zobrist_key.
+# Replace it with a TranspositionTable of a different size or replacement policy to configure it.
+transposition_table = transposition.TranspositionTable()
+
+# Killer moves, history scores and cutoff statistics used to order moves in the search.
+move_ordering = ordering.MoveOrdering()
+
+# Mobility of recently evaluated positions, for evaluate.
+mobility_cache = mobility.MobilityCache()
+
+# Deepest search iterative_deepening will start.
+MAX_DEPTH = 32
+
+# Number of positions visited by the most recent call to mini_max: nodes_searched by the
+# main search, and quiescence_nodes by the quiescence search at its leaves.
+nodes_searched = 0
+quiescence_nodes = 0
+
+# Depth of the last iteration iterative_deepening completed.
+depth_reached = 0
+
+# Number of positions evaluate has scored, and the most moves past the root the search has
+# looked (its selective depth, which the quiescence search takes beyond depth_reached).
+evaluations = 0
+selective_depth = 0
+
+# Seconds taken and nodes searched by each iteration iterative_deepening completed, from depth 1 up.
+depth_times = []
+depth_nodes = []
+
+# Path of a file each call to choose_move appends its stats.SearchStats to as a line of JSON, or None.
+stats_log = None
+
+# Budget for the search in progress: the time.time() it must stop by and the number of
+# nodes it may visit. None means no limit.
+search_deadline = None
+search_node_limit = None
+
+# threading.Event that another thread sets to stop the search in progress, or None.
+search_stop = None
+
+# threading.Event that is set while the search in progress is pondering, or None.
+# A pondering search ignores its time limit until the event is cleared.
+search_ponder = None
+
+
+# Score larger than any evaluation, used for windows that are open on one side.
+INFINITY = sys.maxsize
+
+# Score of being checkmated, beyond any evaluation. negamax adds the depth left to it,
+# so that quicker mates score further from zero.
+MATE_SCORE = 1000
+
+# Width of the null windows principal variation search proves moves are no better with.
+NULL_WINDOW = 0.01
+
+# Half the width of the window iterative_deepening searches around the previous iteration's score.
+ASPIRATION_WINDOW = 0.5
+
+# Selective search: each of these can be switched off on its own (see negamax).
+# Null move pruning lets the side to move pass, and searches NULL_MOVE_REDUCTION moves shallower
+# to see if the position is still good enough to fail high.
+NULL_MOVE_PRUNING = True
+NULL_MOVE_REDUCTION = 2
+
+# Late move reductions search quiet moves ordered after the first LATE_MOVE_INDEX moves one move
+# shallower, at nodes with at least LATE_MOVE_DEPTH moves left.
+LATE_MOVE_REDUCTIONS = True
+LATE_MOVE_INDEX = 3
+LATE_MOVE_DEPTH = 3
+
+# Futility pruning skips quiet moves one move from the leaves when the evaluation
+# is more than FUTILITY_MARGIN below alpha.
+FUTILITY_PRUNING = True
+FUTILITY_MARGIN = 1.5
+
+# The quiescence search plays out captures at the leaves of the search before evaluating.
+# Delta pruning skips captures that would leave the score more than DELTA_MARGIN below alpha
+# even after winning the captured piece.
+QUIESCENCE_SEARCH = True
+DELTA_MARGIN = 2
+
+
+# Seconds between thread switches while a BackgroundSearch runs.
+SWITCH_INTERVAL = 0.0005
+
+
+# Raised inside the search when its time or node budget runs out.
+# The iteration in progress is thrown away by iterative_deepening.
+class SearchTimeout(Exception):
+    pass
+
 
 # Takes each move for each piece and puts it in a format that is easier to work with.
 # Returns a list of tuples where the tuple's first index is a reference to the piece,
-# and the second index is the move.
+# and the second index is the move. Only legal moves are returned (see engine.Chess.legal_moves).
+# A bitboard.Bitboard returns its own (from square, to square) tuples instead.
 def move_list(game, color):
-    if color == Color.WHITE:
-        pieces = game.white_pieces
-    else:
-        pieces = game.black_pieces
-    moves = []
-    for piece in pieces:
-        piece_moves = piece.available_moves(game.board)
-        for move in piece_moves:
-            moves.append((piece, move))
-    return moves
+    return game.legal_moves(color)
+
+
+# Returns the moves of the given color that capture a piece, in the format of move_list.
+def capture_list(game, color):
+    return game.legal_captures(color)
 
 
 # Randomly moves a piece on the board
@@ -35,174 +136,416 @@ def rand_turn(game, screen):
             moves.remove(moves[index])
             index = randrange(len(moves))
     game.player_move = True
-    game.turn = Color.WHITE
 
 
 # Minimax decision tree algorithm for determining which move the computer should make.
 # White tries to maximize the advantage, while black tries to minimize it
 # Double check colors are right
 # First index returns the value, second index returns the piece, third index returns the move
-def mini_max(game, turns, screen):
-    move = minimax_helper(game, turns, True, alpha=-sys.maxsize - 1, beta=sys.maxsize)
+# Pass backend=BITBOARD to search a bitboard copy of the game instead of the game itself.
+# Turns is the deepest search to run; time_limit (in seconds) and node_limit stop it sooner.
+# Returns False, without moving, if the computer has no legal move.
+def mini_max(game, turns, screen, backend=BOARD, time_limit=None, node_limit=None):
+    move = choose_move(game, turns, backend, time_limit, node_limit)[0]
+    if move is None or len(move) < 3:
+        game.player_move = True
+        return False
     game.move_piece(screen, piece=move[1], position=move[2][1])
-    game.turn = Color.WHITE
     game.player_move = True
-
-
-"""    if game.turns_passed < 20:
-        current_score = early_eval(game.white_pieces, game.black_pieces)
-    elif len(game.black_pieces) > 8 and len(game.white_pieces) > 8:
-        current_score = middle_eval(game, game.white_pieces, game.black_pieces)
+    return True
+
+
+# Searches the game without playing or drawing anything, so it works on an engine.Chess
+# as well as a chess.Chess, and returns the result of iterative_deepening along with
+# a stats.SearchStats of the search, which is also written to stats_log if it is set.
+# The move is always given in terms of the game's pieces, whichever backend searched it,
+# but report (see iterative_deepening) gets the results of the searched game.
+def choose_move(game, turns, backend=BOARD, time_limit=None, node_limit=None, stop=None, report=None,
+                ponder=None):
+    global nodes_searched, quiescence_nodes, evaluations, selective_depth
+    nodes_searched = 0
+    quiescence_nodes = 0
+    evaluations = 0
+    selective_depth = 0
+    start = time.time()
+    tt_probes = transposition_table.probes
+    tt_hits = transposition_table.hits
+    transposition_table.new_search()
+    if backend == BITBOARD:
+        move = iterative_deepening(Bitboard.from_game(game), turns, time_limit, node_limit, stop, report, ponder)
+        if move is not None and len(move) > 2:
+            # Play the principal variation on the game to find the pieces making its moves, then take it back
+            line = []
+            for from_sq, to_sq in move[3]:
+                from_column, from_row = bitboard.coordinates(from_sq)
+                line.append((game.board[from_column][from_row], bitboard.coordinates(to_sq)))
+                game.make_move(line[-1])
+            for step in line:
+                game.unmake_move()
+            move = [move[0], line[0][0], line[0], line]
     else:
-        current_score = endgame_eval(game.white_pieces, game.black_pieces)"""
-
-
-# We fundamentally want to maximize our score, while white wants to minimize it.
-# First: Update the move_list method
-# Get a list of each possible move, and edit the board to simulate that move happening.
-#       a.) Change the piece's internal coords
-#       b.) Save any piece that may be at the desired coords
-#       c.) Remove the old piece from its list
-#       c.) Change the piece's location on the board
-#       d.) Call the recursive function
-#       e.) Change the piece's internal coords
-#       f.) Change the piece's board location to its old location
-#       f.) Add the old piece back to its list
-#       g.) Place the old piece back on the board
-# Also change pieces' internal coords before and after the recursive call
-# Base case: return the score and the piece/move combo
+        move = iterative_deepening(game, turns, time_limit, node_limit, stop, report, ponder)
+
+    search_stats = stats.SearchStats()
+    search_stats.set_result(move)
+    search_stats.seconds = time.time() - start
+    search_stats.depth = depth_reached
+    search_stats.selective_depth = selective_depth
+    search_stats.nodes = nodes_searched
+    search_stats.quiescence_nodes = quiescence_nodes
+    search_stats.evaluations = evaluations
+    search_stats.depth_times = depth_times[:]
+    search_stats.depth_nodes = depth_nodes[:]
+    search_stats.cutoffs = move_ordering.cutoffs
+    search_stats.first_move_cutoffs = move_ordering.first_move_cutoffs
+    search_stats.tt_probes = transposition_table.probes - tt_probes
+    search_stats.tt_hits = transposition_table.hits - tt_hits
+    if stats_log is not None:
+        search_stats.write(stats_log)
+    return move, search_stats
+
+
+# Runs choose_move on a copy of the game in a background thread, so that a GUI can keep
+# drawing while the AI thinks. Poll done(), then take result, whose piece belongs to the
+# original game, and stats, the search's stats.SearchStats.
+# cancel() stops the search and throws its result away.
+# Only one search may run at a time, since they share the module's tables and counters.
+# While it runs, threads switch every SWITCH_INTERVAL seconds instead of Python's default
+# 5ms, so the thread drawing the GUI doesn't wait long for its turn.
+# Given a ponder_move, a move of the side to move in game, the search ponders: it plays the move
+# on its copy and searches the reply while the opponent is still thinking, with no time limit.
+# If the opponent plays that move, ponder_hit starts the time limit, counted from when the search
+# began, so the reply comes sooner by the time already spent. Otherwise cancel it.
+class BackgroundSearch:
+
+    def __init__(self, game, turns, backend=BOARD, time_limit=None, node_limit=None, ponder_move=None):
+        self.game = game
+        self.time_limit = time_limit
+        self.start = time.time()
+        self.result = None
+        self.stats = None
+        self.stop = threading.Event()
+        self.ponder_move = ponder_move
+        self.pondering = None
+        search_game = copy.deepcopy(game)
+        if ponder_move is not None:
+            self.pondering = threading.Event()
+            self.pondering.set()
+            piece = search_game.board[ponder_move[0].column][ponder_move[0].row]
+            search_game.make_move((piece,) + tuple(ponder_move[1:]))
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(SWITCH_INTERVAL)
+        self.thread = threading.Thread(target=self.run, daemon=True,
+                                       args=(search_game, turns, backend, time_limit, node_limit))
+        self.thread.start()
+
+    def run(self, game, turns, backend, time_limit, node_limit):
+        try:
+            move, search_stats = choose_move(game, turns, backend, time_limit, node_limit, self.stop,
+                                             ponder=self.pondering)
+        finally:
+            sys.setswitchinterval(self.switch_interval)
+        if move is not None and not self.stop.is_set():
+            self.stats = search_stats
+            # Without a legal move the search only has a score, and result stays None
+            if len(move) > 2:
+                piece = self.game.board[move[1].column][move[1].row]
+                self.result = [move[0], piece, (piece, move[2][1])] + move[3:]
+
+    # True once the search has finished or been cancelled.
+    def done(self):
+        return not self.thread.is_alive()
+
+    # Stops the search and waits for the thread to finish.
+    def cancel(self):
+        self.stop.set()
+        self.thread.join()
+
+    # Called once the opponent has played ponder_move: the search stops pondering and finishes
+    # within its time limit. Returns the seconds this saves, the time already spent searching.
+    def ponder_hit(self):
+        self.pondering.clear()
+        saved = time.time() - self.start
+        return saved if self.time_limit is None else min(saved, self.time_limit)
+
+    # Fraction of the time limit used so far, for showing progress.
+    # None without a time limit, or while pondering.
+    def progress(self):
+        if self.time_limit is None or self.pondering is not None and self.pondering.is_set():
+            return None
+        return min(1.0, (time.time() - self.start) / self.time_limit)
+
+
+# Searches to depth 1, 2, 3 ... max_depth, stopping early once time_limit seconds have passed
+# or node_limit nodes have been searched, and returns the result of the last completed iteration.
+# The first iteration always completes so that there is a move to return,
+# unless stop, a threading.Event, is set from another thread: then None is returned.
+# Each iteration stores its best moves in the transposition table, where the next, deeper
+# iteration finds them and searches them first.
+# After the first iteration the search starts with an aspiration window of ASPIRATION_WINDOW
+# around the previous score, and opens the side it fell outside of to search again if it misses.
+# Report, if given, is called with the depth and result of each iteration as it completes.
+# While ponder, a threading.Event, is set the time limit is ignored (see BackgroundSearch).
+# Returns [score, piece, move, principal variation] like minimax_helper.
+def iterative_deepening(game, max_depth, time_limit=None, node_limit=None, stop=None, report=None, ponder=None):
+    global search_deadline, search_node_limit, search_stop, search_ponder, depth_reached, depth_times, depth_nodes
+    start = time.time()
+    search_stop = stop
+    search_ponder = ponder
+    history_length = len(game.history)
+    best = None
+    score = 0
+    depth_reached = 0
+    depth_times = []
+    depth_nodes = []
+    move_ordering.new_search(game)
+    for depth in range(1, max_depth + 1):
+        iteration_start = time.time()
+        iteration_nodes = nodes_searched + quiescence_nodes
+        if best is not None:
+            search_deadline = None if time_limit is None else start + time_limit
+            search_node_limit = node_limit
+            alpha = score - ASPIRATION_WINDOW
+            beta = score + ASPIRATION_WINDOW
+        else:
+            alpha = -INFINITY
+            beta = INFINITY
+        try:
+            while True:
+                pv = []
+                score = negamax(game, depth, alpha, beta, pv)
+                if score <= alpha:
+                    alpha = -INFINITY
+                elif score >= beta:
+                    beta = INFINITY
+                else:
+                    break
+        except SearchTimeout:
+            # Take back the moves the interrupted iteration was in the middle of
+            while len(game.history) > history_length:
+                if game.history[-1][0] is None:
+                    game.unmake_null_move()
+                else:
+                    game.unmake_move()
+            break
+        finally:
+            search_deadline = None
+            search_node_limit = None
+        best = search_result(game, score, pv)
+        depth_reached = depth
+        depth_times.append(time.time() - iteration_start)
+        depth_nodes.append(nodes_searched + quiescence_nodes - iteration_nodes)
+        if report is not None:
+            report(depth, best)
+    search_stop = None
+    search_ponder = None
+    return best
+
+
+# Raises SearchTimeout if the search has used up its time or node budget, or was told to stop.
+# The node budget counts the nodes of the quiescence search too.
+def check_budget():
+    if (search_deadline is not None and time.time() >= search_deadline and
+            (search_ponder is None or not search_ponder.is_set())) or \
+            (search_node_limit is not None and nodes_searched + quiescence_nodes >= search_node_limit) or \
+            (search_stop is not None and search_stop.is_set()):
+        raise SearchTimeout
+
+
+# Searches turns moves deep with the alpha-beta window (alpha, beta), where scores are
+# positive when black is ahead.
+# Maximize is True when it is black's turn, who tries to maximize the score, and False when
+# it is white's, who tries to minimize it. It has to match game.turn.
+# First index returns the value, second index returns the piece, third index returns the move
+# and the fourth the principal variation: the moves both sides are expected to play from here.
+# Game may be a chess.Chess or a bitboard.Bitboard: both provide make_move, unmake_move and zobrist_key.
 def minimax_helper(game, turns, maximize, alpha, beta):
+    pv = []
+    # Negamax scores for the side to move, which search_result turns back around for white
+    if maximize:
+        score = negamax(game, turns, alpha, beta, pv)
+    else:
+        score = negamax(game, turns, -beta, -alpha, pv)
+    return search_result(game, score, pv, maximize)
+
+
+# Puts a score from the point of view of the side to move and its principal variation
+# into the [score, piece, move, principal variation] format minimax_helper returns,
+# with the score positive when black is ahead.
+def search_result(game, score, pv, maximize=None):
+    if maximize is None:
+        maximize = game.turn == Color.BLACK
+    if not maximize:
+        score = -score
+    if not pv:
+        return [score]
+    return [score, pv[0][0], pv[0], pv]
+
+
+# Negamax search with alpha-beta pruning: every position is scored from the point of view of the
+# side to move, so the score of a move is the negated score of the position it leads to.
+# Fails soft, returning the best score found even when it falls outside (alpha, beta).
+# Searches the first move, which move_ordering puts first as the most likely best, with the full
+# window and every later one with a null window just above alpha that only proves it is no better;
+# a move that turns out to be better is searched again with the full window.
+# Pv is filled in with the principal variation of the position, and is None for the null window
+# searches, which don't need one and may take their score from the transposition table instead.
+# Null window searches are also where the search may be selective, unless the side to move is in check:
+# - null move pruning returns early if passing the turn still fails high. It is not tried twice in a row,
+#   or by a side with only pawns left, where having to move may be what loses (zugzwang).
+# - futility pruning skips quiet moves one move from the leaves if the evaluation is far below alpha.
+# Late move reductions search quiet moves ordered late, which rarely turn out best, with a reduced
+# null window first, and only search them to the full depth if they beat alpha.
+# The leaves are scored by the quiescence search, and count as its nodes.
+def negamax(game, turns, alpha, beta, pv):
+    global nodes_searched
+    if turns == 0 and QUIESCENCE_SEARCH and not game.in_checkmate:
+        return quiescence(game, alpha, beta)
+    nodes_searched += 1
+    if search_deadline is not None or search_node_limit is not None or search_stop is not None:
+        check_budget()
     if turns == 0 or game.in_checkmate:
-        if game.turns_passed < 20:
-            current_score = early_eval(game.white_pieces, game.black_pieces)
+        return evaluate(game) if game.turn == Color.BLACK else -evaluate(game)
+
+    # Reuse the result of an earlier search of this position if it was deep enough
+    # and its score is exact or a bound that falls outside the window.
+    # Positions on the principal variation are always searched so that it is complete.
+    # Otherwise its best move is searched first.
+    key = game.zobrist_key
+    entry = transposition_table.probe(key)
+    hash_move = None
+    if entry is not None:
+        if entry[1] >= turns and pv is None:
+            score = entry[2]
+            bound = entry[3]
+            if bound == transposition.EXACT or \
+                    bound == transposition.LOWER_BOUND and score >= beta or \
+                    bound == transposition.UPPER_BOUND and score <= alpha:
+                return score
+        hash_move = bitboard.unpack_move(game, entry[4])
+
+    color = game.turn
+    in_check = game.in_check(color)
+    static_score = None
+    if pv is None and not in_check and (NULL_MOVE_PRUNING or FUTILITY_PRUNING and turns == 1):
+        static_score = evaluate(game) if color == Color.BLACK else -evaluate(game)
+        if NULL_MOVE_PRUNING and turns > NULL_MOVE_REDUCTION and static_score >= beta and \
+                game.has_non_pawn_material(color) and game.history and game.history[-1][0] is not None:
+            game.make_null_move()
+            score = -negamax(game, turns - 1 - NULL_MOVE_REDUCTION, -beta, -beta + NULL_WINDOW, None)
+            game.unmake_null_move()
+            if score >= beta:
+                # A mate found after passing is not a mate the side to move can rely on
+                return score if score < MATE_SCORE else beta
+    futile = FUTILITY_PRUNING and turns == 1 and static_score is not None and static_score + FUTILITY_MARGIN <= alpha
+
+    moves = move_ordering.order(game, move_list(game, color), hash_move, color)
+    if not moves:
+        return -MATE_SCORE - turns if in_check else 0
+    original_alpha = alpha
+    best_score = -INFINITY
+    best_move = None
+    child_pv = None
+    for i in range(len(moves)):
+        move = moves[i]
+        reduce = False
+        if (futile or LATE_MOVE_REDUCTIONS and i >= LATE_MOVE_INDEX and turns >= LATE_MOVE_DEPTH and not in_check) \
+                and ordering.is_quiet(game, move):
+            if futile:
+                best_score = max(best_score, static_score + FUTILITY_MARGIN)
+                continue
+            reduce = True
+        game.make_move(move)
+        if i == 0:
+            child_pv = None if pv is None else []
+            score = -negamax(game, turns - 1, -beta, -alpha, child_pv)
         else:
-            if len(game.black_pieces) > 8 and len(game.white_pieces) > 8:
-                current_score = middle_eval(game, game.white_pieces, game.black_pieces)
-            else:
-                current_score = endgame_eval(game.white_pieces, game.black_pieces)
-        return [current_score]
-    if maximize:
-        return black_minimax(game, turns, alpha=alpha, beta=beta)
+            # Quiet moves that give check are searched to the full depth
+            reduce = reduce and not game.in_check(game.turn)
+            if reduce:
+                score = -negamax(game, turns - 2, -alpha - NULL_WINDOW, -alpha, None)
+            if not reduce or score > alpha:
+                child_pv = None if pv is None else []
+                score = -negamax(game, turns - 1, -alpha - NULL_WINDOW, -alpha, None)
+                if alpha < score < beta:
+                    child_pv = None if pv is None else []
+                    score = -negamax(game, turns - 1, -beta, -alpha, child_pv)
+        game.unmake_move()
+
+        if score > best_score:
+            best_score = score
+            best_move = move
+            if score > alpha:
+                alpha = score
+                if pv is not None:
+                    pv[:] = [move] + child_pv
+                if score >= beta:
+                    move_ordering.record_cutoff(game, move, i, turns, color)
+                    break
+
+    if best_score <= original_alpha:
+        bound = transposition.UPPER_BOUND
+    elif best_score >= beta:
+        bound = transposition.LOWER_BOUND
     else:
-        return white_minimax(game, turns, alpha=alpha, beta=beta)
-
-
-# Potential problem: evaluating score before base case but probably not
-# Black tries to maximize
-def black_minimax(game, turns, alpha, beta):
-    moves = move_list(game, Color.BLACK)
-    max_score = -sys.maxsize - 1
-    best_moves = []
-
-    # Alpha beta pruning eval
-    if beta < alpha:
-        return [None]
-
-    for i in range(0, len(moves)):
-        # Create coordinates for the piece's potential new location
-        new_y = moves[i][1][0]
-        new_x = moves[i][1][1]
-
-        # Store the piece's current location (before the move)
-        current_piece = moves[i][0]
-        old_y = current_piece.column
-        old_x = current_piece.row
-
-        # Temporarily change the piece's location
-        current_piece.column = new_y
-        current_piece.row = new_x
-
-        # Check if an enemy piece is currently in the square you would like to move to
-        old_piece = game.board[new_y][new_x]
-        removed = False
-        if old_piece is not None and old_piece in game.white_pieces:
-            game.white_pieces.remove(old_piece)
-            removed = True
-
-        # Move the piece on the board
-        game.board[new_y][new_x] = current_piece
-
-        # Find the best next move AFTER this move
-        next_move = minimax_helper(game, turns - 1, False, alpha=max_score, beta=beta)
-
-        # If the board state is better than our current board state, make it our new best move
-        if next_move[0] == max_score:
-            best_moves.append([next_move[0], current_piece, moves[i]])
-        if next_move[0] > max_score:
-            max_score = next_move[0]
-            best_moves = [[next_move[0], current_piece, moves[i]]]
-
-        # Move the piece back to where it belongs
-        current_piece.column = old_y
-        current_piece.row = old_x
-
-        # If we removed a piece, add it back
-        if old_piece is not None and removed:
-            game.white_pieces.append(old_piece)
-        game.board[old_y][old_x] = current_piece
-        if removed or old_piece is None:
-            game.board[new_y][new_x] = old_piece
-
-    # If there are multiple best removes, randomly select one
-    if len(best_moves) > 1:
-        return best_moves[randrange(len(best_moves))]
-    return best_moves[0]
-
-
-# White tries to minimize
-def white_minimax(game, turns, alpha, beta):
-    moves = move_list(game, Color.WHITE)
-    min_score = sys.maxsize
-    best_moves = []
-
-    for i in range(0, len(moves)):
-        # Create coordinates for the piece's potential new location
-        new_y = moves[i][1][0]
-        new_x = moves[i][1][1]
-
-        # Store the piece's current location (before the move)
-        current_piece = moves[i][0]
-        old_y = current_piece.column
-        old_x = current_piece.row
-
-        # Temporarily change the piece's location
-        current_piece.column = new_y
-        current_piece.row = new_x
-
-        # Check if an enemy piece is currently in the square you would like to move to
-        old_piece = game.board[new_y][new_x]
-        removed = False
-        if old_piece is not None and old_piece in game.black_pieces:
-            game.black_pieces.remove(old_piece)
-            removed = True
-        # Move the piece on the board
-        game.board[new_y][new_x] = current_piece
-
-        # Find the best next move AFTER this move
-        next_move = minimax_helper(game, turns - 1, True, alpha=alpha, beta=min_score)
-
-        # If the board state is better than our current board state, make it our new best move
-        if next_move[0] == min_score:
-            best_moves.append([next_move[0], current_piece, moves[i]])
-        if next_move[0] is not None and next_move[0] < min_score:
-            min_score = next_move[0]
-            best_moves = [[next_move[0], current_piece, moves[i]]]
-
-        # Move the piece back to where it belongs
-        current_piece.column = old_y
-        current_piece.row = old_x
-
-        # If we removed a piece, add it back
-        if old_piece is not None and removed:
-            game.black_pieces.append(old_piece)
-        game.board[old_y][old_x] = current_piece
-        if removed or old_piece is None:
-            game.board[new_y][new_x] = old_piece
-
-    # If there are multiple best removes, randomly select one
-    if len(best_moves) > 1:
-        return best_moves[randrange(len(best_moves))]
-    return best_moves[0]
+        bound = transposition.EXACT
+    # Every move may have been pruned as futile, leaving no move to remember
+    if best_move is not None:
+        transposition_table.store(key, turns, best_score, bound, bitboard.pack_move(game, best_move))
+    return best_score
+
+
+# Searches only the captures of a position, until none are left that are worth making, so that
+# a leaf of the search isn't scored in the middle of an exchange (the horizon effect).
+# The side to move may also stand pat, keeping the evaluation, instead of capturing.
+# Captures that lose material by static exchange evaluation are skipped, and so are captures that
+# can't bring the score back up to alpha (delta pruning). Scores are for the side to move, as in negamax.
+def quiescence(game, alpha, beta):
+    global quiescence_nodes
+    quiescence_nodes += 1
+    if search_deadline is not None or search_node_limit is not None or search_stop is not None:
+        check_budget()
+    stand_pat = evaluate(game) if game.turn == Color.BLACK else -evaluate(game)
+    if stand_pat >= beta:
+        return stand_pat
+    alpha = max(alpha, stand_pat)
+    best_score = stand_pat
+    color = game.turn
+    for move in move_ordering.order(game, capture_list(game, color), None, color):
+        victim, attacker = ordering.capture_values(game, move)
+        if stand_pat + victim + DELTA_MARGIN <= alpha:
+            continue
+        # Taking a piece worth at least the one capturing can't lose material
+        if victim < attacker and ordering.static_exchange(game, move) < 0:
+            continue
+        game.make_move(move)
+        score = -quiescence(game, -beta, -alpha)
+        game.unmake_move()
+        if score > best_score:
+            best_score = score
+            if score > alpha:
+                alpha = score
+                if score >= beta:
+                    break
+    return best_score
+
+
+# Scores the position at a leaf of the search from the material and piece-square scores
+# game.make_move keeps up to date, using the ones for the phase of the game its material puts it in.
+# In the middle game the ability for pieces to move becomes important, so mobility is added,
+# taken from mobility_cache so that positions reached again don't count their moves again.
+# Counts the evaluations and the selective depth for choose_move's statistics as it goes.
+def evaluate(game):
+    global evaluations, selective_depth
+    evaluations += 1
+    if len(game.history) - move_ordering.root_ply > selective_depth:
+        selective_depth = len(game.history) - move_ordering.root_ply
+    phase = evaluation.phase(game.phase_material)
+    score = game.scores[phase] / evaluation.SCALE
+    if phase == evaluation.MIDDLE_GAME:
+        moves = mobility_cache.lookup(game)
+        score += (moves[Color.BLACK] - moves[Color.WHITE]) * .05
+    return score
 
 
 # Formula for weighting moves in the mini_max algorithm.
@@ -226,75 +569,3 @@ def basic_board_eval(board):
                 else:
                     total_value += board[i][j].val
     return total_value
-
-
-# Principles:
-# 1.) Knights and bishops come before queens and rooks
-# 2.) Try to develop pieces towards the center
-# 3.) Try not to move a piece twice before move 10
-# 4.) Don't bring your queen out too early
-# 5.) Castle before move 10
-# 6.) Attack towards the center
-# 7.) "Connect" your rooks: Make it so there are no pieces between them
-def early_eval(white_pieces, black_pieces):
-    total_value = 0
-    for piece in white_pieces:
-        total_value -= piece.val
-        if isinstance(piece, Bishop) and piece.column != 0:
-            total_value -= .01
-        if isinstance(piece, Knight) and piece.column != 0:
-            total_value -= .01
-        if piece.moved:
-            total_value -= .01
-        if 1 < piece.row < 6:
-            total_value -= .01
-        if piece.column < 6:
-            total_value -= .01
-    for piece in black_pieces:
-        total_value += piece.val
-        if isinstance(piece, Bishop) and piece.column != 0:
-            print(piece.val)
-            total_value += .01
-        if isinstance(piece, Knight) and piece.column != 0:
-            total_value += .01
-        if piece.moved:
-            total_value += .01
-        if 1 < piece.row < 6:
-            total_value += .01
-        if piece.column > 1:
-            total_value += .01
-    return total_value
-
-
-# Middle Game Principles
-# Ability for pieces to move becomes important
-# Try to get a pawn close to promotion
-def middle_eval(game, white_pieces, black_pieces):
-    total_value = 0
-    for piece in white_pieces:
-        total_value -= piece.val
-        moves = len(piece.available_moves(game.board))
-        total_value -= moves * .05
-        if isinstance(piece, Pawn):
-            total_value -= .05
-    for piece in black_pieces:
-        total_value += piece.val
-        moves = len(piece.available_moves(game.board))
-        total_value += moves * .05
-        if isinstance(piece, Pawn):
-            total_value += .05
-    return total_value
-
-
-# Try to promote a pawn
-def endgame_eval(white_pieces, black_pieces):
-    total_value = 0
-    for piece in white_pieces:
-        total_value -= piece.val
-        if isinstance(piece, Pawn):
-            total_value -= .1
-    for piece in black_pieces:
-        total_value += piece.val
-        if isinstance(piece, Pawn):
-            total_value += .1
-    return total_value
@@ -0,0 +1,516 @@
+import evaluation
+import zobrist
+from pieces.bishop import Bishop
+from pieces.king import King
+from pieces.knight import Knight
+from pieces.pawn import Pawn
+from pieces.piece import Color
+from pieces.queen import BETWEEN, Queen
+from pieces.rook import Rook
+
+NUM_SQUARES = 8
+BOARD_SIZE = NUM_SQUARES * NUM_SQUARES
+FULL_BOARD = (1 << BOARD_SIZE) - 1
+
+# Each side keeps one 64 bit integer per piece type.
+# These are the indices of those integers.
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+# Maps each piece class to its index in a side's list of bitboards.
+# Rook and Bishop extend Queen, so the exact class is used as the key.
+PIECE_TYPES = {Pawn: PAWN, Knight: KNIGHT, Bishop: BISHOP, Rook: ROOK, Queen: QUEEN, King: KING}
+PIECE_CLASSES = [Pawn, Knight, Bishop, Rook, Queen, King]
+
+# Zobrist keys indexed by color, piece type and square.
+KEYS = {color: [zobrist.PIECE_KEYS[color][piece_class] for piece_class in PIECE_CLASSES]
+        for color in (Color.WHITE, Color.BLACK)}
+
+# Piece values, indexed by piece type. These match Piece.val for each piece class.
+VALUES = [1, 3, 3, 5, 9, 10]
+
+# Evaluation piece-square scores indexed by color, piece type and square,
+# and the phase material of each piece type.
+SCORES = {color: [evaluation.SQUARE_SCORES[color][piece_class] for piece_class in PIECE_CLASSES]
+          for color in (Color.WHITE, Color.BLACK)}
+PHASE_VALUES = [evaluation.PHASE_VALUES[piece_class] for piece_class in PIECE_CLASSES]
+
+# (column, row) steps for each sliding direction.
+# A direction is "positive" if it walks towards higher square indices.
+DIAGONALS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+STRAIGHTS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+
+# Squares are numbered column by column, matching the layout of Chess.board:
+# square 0 is board[0][0], square 7 is board[0][7] and square 63 is board[7][7].
+def square(column, row):
+    return column * NUM_SQUARES + row
+
+
+# Converts a square index back into the (column, row) coordinates used by Chess.board.
+def coordinates(sq):
+    return divmod(sq, NUM_SQUARES)
+
+
+# Returns the square of the lowest set bit of a bitboard.
+def lowest_square(bb):
+    return (bb & -bb).bit_length() - 1
+
+
+# Returns the square of the highest set bit of a bitboard.
+def highest_square(bb):
+    return bb.bit_length() - 1
+
+
+# Yields the square of every set bit of a bitboard, lowest first.
+def squares(bb):
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+# Builds a table holding, for every square, the bitboard of squares reachable
+# by a single step of each of the given offsets.
+def step_table(offsets):
+    table = []
+    for column in range(NUM_SQUARES):
+        for row in range(NUM_SQUARES):
+            bb = 0
+            for column_step, row_step in offsets:
+                if 0 <= column + column_step < NUM_SQUARES and 0 <= row + row_step < NUM_SQUARES:
+                    bb |= 1 << square(column + column_step, row + row_step)
+            table.append(bb)
+    return table
+
+
+# Builds a table holding, for every square, the bitboard of squares on the ray
+# leaving that square in the given direction (the square itself excluded).
+def ray_table(column_step, row_step):
+    table = []
+    for column in range(NUM_SQUARES):
+        for row in range(NUM_SQUARES):
+            bb = 0
+            i = column + column_step
+            j = row + row_step
+            while 0 <= i < NUM_SQUARES and 0 <= j < NUM_SQUARES:
+                bb |= 1 << square(i, j)
+                i += column_step
+                j += row_step
+            table.append(bb)
+    return table
+
+
+KNIGHT_MOVES = step_table([(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)])
+KING_MOVES = step_table(DIAGONALS + STRAIGHTS)
+
+# Squares a pawn attacks: diagonally forwards, towards higher columns for black and lower ones for white.
+PAWN_ATTACKS = {Color.BLACK: step_table([(1, 1), (1, -1)]), Color.WHITE: step_table([(-1, 1), (-1, -1)])}
+
+# Rays are stored as (table, positive) pairs so the first blocker can be found
+# with a single bit scan in the right direction.
+DIAGONAL_RAYS = [(ray_table(c, r), c * NUM_SQUARES + r > 0) for c, r in DIAGONALS]
+STRAIGHT_RAYS = [(ray_table(c, r), c * NUM_SQUARES + r > 0) for c, r in STRAIGHTS]
+
+# BETWEEN_MASKS[a][b] is the bitboard of the squares strictly between squares a and b on the same
+# row, column or diagonal, or 0 if they aren't on one (see pieces.queen.BETWEEN).
+BETWEEN_MASKS = [[sum(1 << square(column, row) for column, row in line or ()) for line in lines] for lines in BETWEEN]
+
+
+# Returns the squares a slider on sq may move along the given rays,
+# stopping at (and including) the first occupied square in each direction.
+def slider_moves(sq, occupied, rays):
+    moves = 0
+    for table, positive in rays:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            blocker = lowest_square(blockers) if positive else highest_square(blockers)
+            ray ^= table[blocker]
+        moves |= ray
+    return moves
+
+
+# Packs a move of a chess.Chess or Bitboard game into a (from square, to square) pair.
+# Packed moves are used wherever moves are remembered between positions (the transposition
+# table, killer moves and history heuristic), since the same position may be reached with
+# different (but identical) piece objects.
+def pack_move(game, move):
+    if isinstance(game, Bitboard):
+        return move
+    piece, (column, row) = move
+    return square(piece.column, piece.row), square(column, row)
+
+
+# Turns a packed (from square, to square) pair back into a move for the game,
+# or returns None if there is no piece on the from square.
+def unpack_move(game, packed):
+    if isinstance(game, Bitboard):
+        return packed if game.mailbox[packed[0]] is not None else None
+    column, row = coordinates(packed[0])
+    piece = game.board[column][row]
+    if piece is None:
+        return None
+    return piece, coordinates(packed[1])
+
+
+# A position stored as one 64 bit integer per piece type and color, plus occupancy masks.
+# It is an alternative backend to the 2D list in chess.Chess.board: it is built from a
+# Chess object and generates the same moves as Piece.available_moves for that position.
+class Bitboard:
+
+    # pieces holds the six bitboards of each side, indexed by piece type.
+    # occupied holds the union of each side's bitboards.
+    # mailbox maps each square to a (color, piece type) pair, or None if it is empty.
+    # moved and passant mirror the Piece.moved and Pawn.can_be_passant flags.
+    # zobrist_key, scores and phase_material are kept equal to those of chess.Chess for the same position.
+    def __init__(self):
+        self.pieces = {Color.WHITE: [0] * 6, Color.BLACK: [0] * 6}
+        self.occupied = {Color.WHITE: 0, Color.BLACK: 0}
+        self.mailbox = [None] * BOARD_SIZE
+        self.moved = 0
+        self.passant = 0
+        self.turn = Color.WHITE
+        self.turns_passed = 0
+        self.in_checkmate = False
+        self.zobrist_key = 0
+        self.scores = [0] * evaluation.NUM_PHASES
+        self.phase_material = 0
+        self.history = []
+
+    # Builds a bitboard position from the pieces of a chess.Chess game.
+    @classmethod
+    def from_game(cls, game):
+        position = cls()
+        for column in range(NUM_SQUARES):
+            for row in range(NUM_SQUARES):
+                piece = game.board[column][row]
+                if piece is None:
+                    continue
+                sq = square(column, row)
+                position.place(piece.color, PIECE_TYPES[type(piece)], sq)
+                if piece.moved:
+                    position.moved |= 1 << sq
+                if isinstance(piece, Pawn) and piece.can_be_passant:
+                    position.passant |= 1 << sq
+        position.turn = game.turn
+        position.turns_passed = game.turns_passed
+        position.in_checkmate = game.in_checkmate
+        position.zobrist_key ^= position.state_key()
+        if game.turn == Color.BLACK:
+            position.zobrist_key ^= zobrist.SIDE_KEY
+        return position
+
+    # Returns the part of the Zobrist key describing castling and en passant state,
+    # following the same rules as chess.Chess.state_key.
+    def state_key(self):
+        key = 0
+        for color, column in ((Color.WHITE, NUM_SQUARES - 1), (Color.BLACK, 0)):
+            king = square(column, 4)
+            if self.mailbox[king] == (color, KING) and not self.moved >> king & 1:
+                for side, row in ((0, NUM_SQUARES - 1), (1, 0)):
+                    rook = square(column, row)
+                    if self.mailbox[rook] == (color, ROOK) and not self.moved >> rook & 1:
+                        key ^= zobrist.CASTLING_KEYS[color][side]
+        if self.passant:
+            key ^= zobrist.EN_PASSANT_KEYS[lowest_square(self.passant) % NUM_SQUARES]
+        return key
+
+    # Puts a piece of the given color and type on an empty square.
+    def place(self, color, piece_type, sq):
+        bit = 1 << sq
+        self.pieces[color][piece_type] |= bit
+        self.occupied[color] |= bit
+        self.mailbox[sq] = (color, piece_type)
+        self.zobrist_key ^= KEYS[color][piece_type][sq]
+        self.add_scores(color, piece_type, sq, 1)
+
+    # Removes and returns whatever (color, piece type) pair is on a square.
+    def remove(self, sq):
+        entry = self.mailbox[sq]
+        if entry is not None:
+            bit = 1 << sq
+            self.pieces[entry[0]][entry[1]] ^= bit
+            self.occupied[entry[0]] ^= bit
+            self.mailbox[sq] = None
+            self.zobrist_key ^= KEYS[entry[0]][entry[1]][sq]
+            self.add_scores(entry[0], entry[1], sq, -1)
+        return entry
+
+    # Adds the scores of a piece on a square to the running evaluation terms,
+    # or takes them away if sign is -1.
+    def add_scores(self, color, piece_type, sq, sign):
+        scores = SCORES[color][piece_type][sq]
+        for phase in range(evaluation.NUM_PHASES):
+            self.scores[phase] += sign * scores[phase]
+        self.phase_material += sign * PHASE_VALUES[piece_type]
+
+    # Does the given color have a piece other than its pawns and king?
+    def has_non_pawn_material(self, color):
+        pieces = self.pieces[color]
+        return self.occupied[color] != pieces[PAWN] | pieces[KING]
+
+    # Is the given color's king attacked?
+    def in_check(self, color):
+        king = self.pieces[color][KING]
+        if not king:
+            return False
+        return self.square_attacked(lowest_square(king), Color.BLACK if color == Color.WHITE else Color.WHITE)
+
+    # Is the square attacked by a piece of the given color?
+    # Occupied, if given, replaces the occupied squares that block the sliding pieces.
+    def square_attacked(self, sq, color, occupied=None):
+        enemy = self.pieces[color]
+        if occupied is None:
+            occupied = self.occupied[Color.WHITE] | self.occupied[Color.BLACK]
+        return bool(KNIGHT_MOVES[sq] & enemy[KNIGHT] or KING_MOVES[sq] & enemy[KING] or
+                    PAWN_ATTACKS[Color.BLACK if color == Color.WHITE else Color.WHITE][sq] & enemy[PAWN] or
+                    slider_moves(sq, occupied, DIAGONAL_RAYS) & (enemy[BISHOP] | enemy[QUEEN]) or
+                    slider_moves(sq, occupied, STRAIGHT_RAYS) & (enemy[ROOK] | enemy[QUEEN]))
+
+    # Returns the bitboard of squares the piece on sq may move to.
+    def piece_moves(self, sq):
+        color, piece_type = self.mailbox[sq]
+        own = self.occupied[color]
+        if piece_type == PAWN:
+            return self.pawn_moves(sq, color)
+        elif piece_type == KNIGHT:
+            return KNIGHT_MOVES[sq] & ~own
+        elif piece_type == KING:
+            return (KING_MOVES[sq] & ~own) | self.castling_moves(sq, color)
+        occupied = own | self.occupied[Color.WHITE if color == Color.BLACK else Color.BLACK]
+        moves = 0
+        if piece_type != ROOK:
+            moves |= slider_moves(sq, occupied, DIAGONAL_RAYS)
+        if piece_type != BISHOP:
+            moves |= slider_moves(sq, occupied, STRAIGHT_RAYS)
+        return moves & ~own
+
+    # Pawn moves, following the same rules as Pawn.can_move:
+    # one square forwards onto an empty square, two from the starting line,
+    # one square diagonally forwards onto an enemy piece, and a diagonal move
+    # next to any pawn that may currently be captured en passant.
+    def pawn_moves(self, sq, color):
+        column, row = coordinates(sq)
+        if color == Color.BLACK:
+            direction = 1
+            start = 1
+            enemy = self.occupied[Color.WHITE]
+        else:
+            direction = -1
+            start = NUM_SQUARES - 2
+            enemy = self.occupied[Color.BLACK]
+        ahead = column + direction
+        if not 0 <= ahead < NUM_SQUARES:
+            return 0
+        empty = ~(self.occupied[Color.WHITE] | self.occupied[Color.BLACK])
+        moves = 0
+        forward = square(ahead, row)
+        if empty >> forward & 1:
+            moves |= 1 << forward
+            if column == start and empty >> square(ahead + direction, row) & 1:
+                moves |= 1 << square(ahead + direction, row)
+        for side in (-1, 1):
+            if 0 <= row + side < NUM_SQUARES:
+                target = square(ahead, row + side)
+                if enemy >> target & 1 or self.passant >> (sq + side) & 1:
+                    moves |= 1 << target
+        return moves
+
+    # Castling moves for an unmoved king, following the same rules as King.can_castle:
+    # the rook in the corner must be unmoved and every square between them empty.
+    def castling_moves(self, sq, color):
+        if self.moved >> sq & 1:
+            return 0
+        occupied = self.occupied[Color.WHITE] | self.occupied[Color.BLACK]
+        first = sq - sq % NUM_SQUARES
+        moves = 0
+        for rook, target in ((first + NUM_SQUARES - 1, sq + 2), (first, sq - 2)):
+            if rook != sq and first <= target < first + NUM_SQUARES and self.mailbox[rook] == (color, ROOK) and \
+                    not self.moved >> rook & 1:
+                low = min(sq, rook)
+                between = ((1 << max(sq, rook)) - 1) ^ ((1 << (low + 1)) - 1)
+                if not occupied & between:
+                    moves |= 1 << target
+        return moves
+
+    # Returns the moves of the piece on (column, row) as a list of (column, row) tuples,
+    # in the same format as Piece.available_moves.
+    def available_moves(self, column, row):
+        return [coordinates(sq) for sq in squares(self.piece_moves(square(column, row)))]
+
+    # Returns every move chess.Chess.legal_moves allows as a list of (from square, to square) tuples.
+    def legal_moves(self, color):
+        return self.legal(color, FULL_BOARD)
+
+    # Returns the captures chess.Chess.legal_captures allows, in the format of legal_moves.
+    # En passant captures are left out.
+    def legal_captures(self, color):
+        return self.legal(color, self.occupied[Color.BLACK if color == Color.WHITE else Color.WHITE])
+
+    # Returns the moves of the given color onto the squares of the targets bitboard that don't leave
+    # its king in check, following chess.Chess.legal_targets: the pieces checking the king and the rays
+    # of the pinned pieces are found once from the king's square. The king may step onto any square the
+    # enemy doesn't attack with the king itself out of the way, and castles only when neither its square
+    # nor the one it passes over is attacked. Other pieces must answer a check and stay on their pin.
+    # En passant can also uncover the king along the pawns' row, so it is the one move still tried out.
+    def legal(self, color, targets):
+        enemy = Color.BLACK if color == Color.WHITE else Color.WHITE
+        enemy_pieces = self.pieces[enemy]
+        own = self.occupied[color]
+        occupied = own | self.occupied[enemy]
+        king = self.pieces[color][KING]
+        king_sq = lowest_square(king)
+
+        # An enemy slider seen from the king once its own pieces in the way are lifted pins the one between them
+        checkers = KNIGHT_MOVES[king_sq] & enemy_pieces[KNIGHT] | PAWN_ATTACKS[color][king_sq] & enemy_pieces[PAWN]
+        pins = {}
+        for rays, sliders in ((DIAGONAL_RAYS, enemy_pieces[BISHOP] | enemy_pieces[QUEEN]),
+                              (STRAIGHT_RAYS, enemy_pieces[ROOK] | enemy_pieces[QUEEN])):
+            lines = slider_moves(king_sq, occupied, rays)
+            checkers |= lines & sliders
+            for pinner in squares(slider_moves(king_sq, occupied & ~(lines & own), rays) & sliders & ~lines):
+                between = BETWEEN_MASKS[king_sq][pinner]
+                pins[lowest_square(between & own)] = between | 1 << pinner
+
+        # Squares a piece other than the king may move to: anywhere out of check, the checker or the
+        # squares between it and the king in check, and nowhere in double check
+        if not checkers:
+            evasions = FULL_BOARD
+        elif checkers & (checkers - 1):
+            evasions = 0
+        else:
+            evasions = checkers | BETWEEN_MASKS[king_sq][lowest_square(checkers)]
+
+        moves = []
+        for sq in squares(own):
+            piece_targets = self.piece_moves(sq) & targets
+            if sq == king_sq:
+                allowed = 0
+                for target in squares(piece_targets):
+                    if abs(target - sq) == 2:
+                        if checkers or self.square_attacked((sq + target) // 2, enemy) or \
+                                self.square_attacked(target, enemy):
+                            continue
+                    elif self.square_attacked(target, enemy, occupied ^ king):
+                        continue
+                    allowed |= 1 << target
+            else:
+                allowed = piece_targets & evasions & pins.get(sq, FULL_BOARD)
+                if self.mailbox[sq][1] == PAWN:
+                    for target in squares(piece_targets & ~occupied & PAWN_ATTACKS[color][sq]):
+                        self.make_move((sq, target))
+                        if self.in_check(color):
+                            allowed &= ~(1 << target)
+                        else:
+                            allowed |= 1 << target
+                        self.unmake_move()
+            for target in squares(allowed):
+                moves.append((sq, target))
+        return moves
+
+    # Returns the square and value of the least valuable piece of the given color that attacks sq,
+    # or None, following chess.Chess.least_valuable_attacker: the pieces on the removed squares are gone.
+    def least_valuable_attacker(self, sq, color, removed):
+        pieces = self.pieces[color]
+        present = ~removed
+        attackers = PAWN_ATTACKS[Color.BLACK if color == Color.WHITE else Color.WHITE][sq] & pieces[PAWN] & present
+        if attackers:
+            return lowest_square(attackers), VALUES[PAWN]
+        attackers = KNIGHT_MOVES[sq] & pieces[KNIGHT] & present
+        if attackers:
+            return lowest_square(attackers), VALUES[KNIGHT]
+        occupied = (self.occupied[Color.WHITE] | self.occupied[Color.BLACK]) & present
+        diagonal = slider_moves(sq, occupied, DIAGONAL_RAYS)
+        attackers = diagonal & pieces[BISHOP] & present
+        if attackers:
+            return lowest_square(attackers), VALUES[BISHOP]
+        straight = slider_moves(sq, occupied, STRAIGHT_RAYS)
+        for piece_type, lines in ((ROOK, straight), (QUEEN, diagonal | straight), (KING, KING_MOVES[sq])):
+            attackers = lines & pieces[piece_type] & present
+            if attackers:
+                return lowest_square(attackers), VALUES[piece_type]
+        return None
+
+    # Returns the number of moves the given color's pieces can make, like chess.Chess.mobility.
+    def mobility(self, color):
+        mobility = 0
+        for sq in squares(self.occupied[color]):
+            mobility += self.piece_moves(sq).bit_count()
+        return mobility
+
+    # Plays a (from square, to square) move, following the same rules as chess.Chess.make_move:
+    # captures (including en passant), castling, promotion to a queen, moved flags,
+    # the passant pawn, the turn, turns_passed, the Zobrist key and the evaluation terms.
+    def make_move(self, move):
+        from_sq, to_sq = move
+        color, piece_type = self.mailbox[from_sq]
+        key = self.zobrist_key ^ self.state_key() ^ zobrist.SIDE_KEY
+        record_key = self.zobrist_key
+
+        # A pawn moving diagonally onto an empty square captures en passant
+        captured_sq = to_sq
+        if piece_type == PAWN and self.mailbox[to_sq] is None and (to_sq - from_sq) % NUM_SQUARES != 0:
+            captured_sq = from_sq - from_sq % NUM_SQUARES + to_sq % NUM_SQUARES
+        self.zobrist_key = key
+        captured = self.remove(captured_sq)
+        self.remove(from_sq)
+
+        # A pawn reaching the far side of the board becomes a queen
+        column = to_sq // NUM_SQUARES
+        if piece_type == PAWN and (column == 0 or column == NUM_SQUARES - 1):
+            self.place(color, QUEEN, to_sq)
+        else:
+            self.place(color, piece_type, to_sq)
+        moved = self.moved
+        self.moved = (self.moved & ~(1 << from_sq) & ~(1 << captured_sq)) | 1 << to_sq
+
+        # A king moving two squares castles: the rook jumps to the square the king passed over
+        rook_sq = None
+        if piece_type == KING and abs(to_sq - from_sq) == 2:
+            first = from_sq - from_sq % NUM_SQUARES
+            rook_sq = first + NUM_SQUARES - 1 if to_sq > from_sq else first
+            self.remove(rook_sq)
+            self.place(color, ROOK, (from_sq + to_sq) // 2)
+            self.moved = (self.moved & ~(1 << rook_sq)) | 1 << (from_sq + to_sq) // 2
+
+        self.history.append((from_sq, to_sq, color, piece_type, captured, captured_sq, rook_sq,
+                             moved, self.passant, record_key))
+
+        # A pawn that moves up 2 squares next to an enemy pawn may be captured en passant next turn
+        self.passant = 0
+        if piece_type == PAWN and abs(to_sq - from_sq) == 2 * NUM_SQUARES:
+            enemy = self.pieces[Color.WHITE if color == Color.BLACK else Color.BLACK][PAWN]
+            row = to_sq % NUM_SQUARES
+            if (row > 0 and enemy >> (to_sq - 1) & 1) or (row < NUM_SQUARES - 1 and enemy >> (to_sq + 1) & 1):
+                self.passant = 1 << to_sq
+        self.turn = Color.BLACK if self.turn == Color.WHITE else Color.WHITE
+        self.turns_passed += 1
+        self.zobrist_key ^= self.state_key()
+
+    # Reverts the most recent call to make_move.
+    def unmake_move(self):
+        from_sq, to_sq, color, piece_type, captured, captured_sq, rook_sq, \
+            self.moved, self.passant, key = self.history.pop()
+        self.remove(to_sq)
+        self.place(color, piece_type, from_sq)
+        if captured is not None:
+            self.place(captured[0], captured[1], captured_sq)
+        if rook_sq is not None:
+            self.remove((from_sq + to_sq) // 2)
+            self.place(color, ROOK, rook_sq)
+        self.turn = Color.BLACK if self.turn == Color.WHITE else Color.WHITE
+        self.turns_passed -= 1
+        self.zobrist_key = key
+
+    # Passes the turn without moving anything, like chess.Chess.make_null_move.
+    def make_null_move(self):
+        self.history.append((None, self.passant, self.zobrist_key))
+        key = self.zobrist_key ^ self.state_key() ^ zobrist.SIDE_KEY
+        self.passant = 0
+        self.turn = Color.BLACK if self.turn == Color.WHITE else Color.WHITE
+        self.zobrist_key = key ^ self.state_key()
+
+    # Takes back the last call to make_null_move.
+    def unmake_null_move(self):
+        null, self.passant, self.zobrist_key = self.history.pop()
+        self.turn = Color.BLACK if self.turn == Color.WHITE else Color.WHITE
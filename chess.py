@@ -2,15 +2,9 @@ import time
 
 import pygame
 
-from queue import Queue
-
 import ai
-from pieces.rook import Rook
-from pieces.knight import Knight
-from pieces.bishop import Bishop
-from pieces.queen import Queen
-from pieces.king import King
-from pieces.pawn import Pawn
+import engine
+from engine import images
 from pieces.piece import Color
 
 length = 64
@@ -23,146 +17,83 @@ BLACK = (80, 38, 0)
 WHITE = (191, 126, 74)
 HIGHLIGHT = (150, 150, 25)
 
-last_screen = None
+# Square of the piece currently highlighted as selected, as a (column, row) pair, or None.
+highlighted = None
 
 num_players = 1
 
-images = {
-    "black_pawn": "sprites/black_pawn.png",
-    "black_rook": "sprites/black_rook.png",
-    "black_knight": "sprites/black_knight.png",
-    "black_bishop": "sprites/black_bishop.png",
-    "black_queen": "sprites/black_queen.png",
-    "black_king": "sprites/black_king.png",
-    "white_pawn": "sprites/white_pawn.png",
-    "white_rook": "sprites/white_rook.png",
-    "white_knight": "sprites/white_knight.png",
-    "white_bishop": "sprites/white_bishop.png",
-    "white_queen": "sprites/white_queen.png",
-    "white_king": "sprites/white_king.png"
-}
-
-
-# The chess class contains groupings of functions and objects pertaining to the inner workings of the
-# chess game, primarily in regards to moving pieces around the game board.
-class Chess:
-
-    # Pieces are stored in lists to more quickly access them.
-    # Pieces are stored in a 2D array to more quickly work with piece location.
-    # Pointers to kings are saved in order to improve the efficiency of castling and check.
-    def __init__(self):
-        self.board = [[None for i in range(NUM_SQUARES)] for j in range(NUM_SQUARES)]
-        self.place_pieces(Color.BLACK)
-        self.place_pieces(Color.WHITE)
-        self.white_pieces = []
-        self.black_pieces = []
-        self.pieces_to_list(Color.BLACK)
-        self.pieces_to_list(Color.WHITE)
-        self.white_king = self.board[7][4]
-        self.black_king = self.board[0][4]
-        self.passant_q = Queue()
-        self.turn = Color.WHITE
-        self.in_checkmate = False
-        self.player_move = True
-        self.turns_passed = 0
-
-    # Places the pieces in the 2D array.
-    # NOT on the board GUI.
-    def place_pieces(self, color):
-        column = 0
-        color_string = "black"
-        if color == Color.WHITE:
-            column = 7
-            color_string = "white"
-        self.board[column][0] = Rook(color, column, 0, images[color_string + "_rook"])
-        self.board[column][1] = Knight(color, column, 1, images[color_string + "_knight"])
-        self.board[column][2] = Bishop(color, column, 2, images[color_string + "_bishop"])
-        self.board[column][3] = Queen(color, column, 3, images[color_string + "_queen"])
-        self.board[column][4] = King(color, column, 4, images[color_string + "_king"])
-        self.board[column][5] = Bishop(color, column, 5, images[color_string + "_bishop"])
-        self.board[column][6] = Knight(color, column, 6, images[color_string + "_knight"])
-        self.board[column][7] = Rook(color, column, 7, images[color_string + "_rook"])
-        if color == Color.BLACK:
-            column = 1
-        else:
-            column = 6
-        for i in range(0, NUM_SQUARES):
-            self.board[column][i] = Pawn(color, column, i, images[color_string + "_pawn"])
-
-    # Adds white pieces to the white list, and black pieces to the black list.
-    def pieces_to_list(self, color):
-        if color == Color.BLACK:
-            for i in range(0, 2):
-                for j in range(0, NUM_SQUARES):
-                    self.black_pieces.append(self.board[i][j])
-        else:
-            for i in range(6, NUM_SQUARES):
-                for j in range(0, NUM_SQUARES):
-                    self.white_pieces.append(self.board[i][j])
+# Seconds the AI may spend choosing a move.
+think_time = 5
+
+# The ai.BackgroundSearch choosing the AI's move, or None when the AI isn't thinking.
+search = None
+
+# Whether the AI ponders in one player games: while the human thinks, it searches its reply to
+# the move it expects them to play, the second move of its principal variation.
+pondering = True
+
+# The ai.BackgroundSearch pondering while the human thinks, or None.
+ponder_search = None
+
+# Number of times the human played the move the AI pondered on, or something else,
+# and the seconds of thinking the hits saved the AI.
+ponder_hits = 0
+ponder_misses = 0
+ponder_time_saved = 0.0
+
+# Text the window title shows, changed to show the AI's progress while it thinks.
+caption = "Chess"
+
+# Every image in images, keyed by its path, loaded once by load_sprites, scaled to sprite_size
+# and converted to the display's pixel format. Shared by all pieces and all games.
+sprites = {}
+sprite_size = None
+
+# Parts of the screen drawn on since the display was last updated, as pygame.Rect objects.
+# update_display pushes them to the display all at once, instead of flipping after each drawing.
+dirty_rects = []
+
+# Number of times update_display has updated the display, and how long the last update took in seconds.
+display_updates = 0
+frame_time = 0.0
+
+
+# The GUI version of engine.Chess: draws the game as it is played.
+class Chess(engine.Chess):
 
     # Draws pieces in their starting position on the GUI.
     def draw_pieces(self, screen):
         for i in range(0, 2):
             for j in range(0, NUM_SQUARES):
-                self.board[i][j].draw(screen, length)
+                draw_piece(screen, self.board[i][j], length)
         for i in range(6, 8):
             for j in range(0, NUM_SQUARES):
-                self.board[i][j].draw(screen, length)
+                draw_piece(screen, self.board[i][j], length)
 
-    # Takes a position and returns any piece that may be at that location.
+    # Takes a position and returns the piece of the side to move at that location, if any.
+    # The board is indexed by square, so this is a lookup.
     def select_piece(self, position):
-        if self.turn == Color.WHITE:
-            for white in self.white_pieces:
-                if white.intersects_grid(length, position[0], position[1]):
-                    return white
-        else:
-            for black in self.black_pieces:
-                if black.intersects_grid(length, position[0], position[1]):
-                    return black
+        piece = self.board[position[1] // length][position[0] // length]
+        if piece is not None and piece.color == self.turn:
+            return piece
         return None
 
     # In order to move:
-    # 1.) Check if you are in check
-    # 2.) Check if the desired move is a castle
-    # 3.) Check if the piece can move (check)
-    # 4.) Set the old coordinates to None
-    # 5.) Change the piece's internal coordinates (check)
-    # 6.) Change the piece's position in the 2D array
-    # 7.) Clear the square
-    # 8.) Draw the piece on a new square
-    # 9.) Remove any captured piece from its list
-    # 10.) See if the move placed your opponent in check/mate
+    # 1.) Play the move if it is allowed (see engine.Chess.play_move)
+    # 2.) Redraw the squares the move changed
+    # 3.) See if the move placed your opponent in check/mate
     def move_piece(self, screen, piece, position):
-        if isinstance(piece, Pawn):
-            print(piece.available_moves(self.board))
         if not self.player_move:
             new_x = position[1]
             new_y = position[0]
         else:
             new_x = position[0] // length
             new_y = position[1] // length
-        screen.blit(last_screen, (0, 0))
-        if self.self_in_check(piece, new_y, new_x):
-            return False
-        elif isinstance(piece, King) and new_x == 6 and self.castle(screen, new_y):
-            pass
-        elif not piece.can_move(self.board, new_y, new_x):
+        self.clear_highlight(screen)
+        if not self.play_move(piece, new_y, new_x):
             return False
-        self.make_passant(screen, piece)
-        self.empty_passants()
-        self.set_en_passant(piece, new_y)
-        self.board[piece.column][piece.row] = None
-        erase_square(screen, piece)
-        piece.column = new_y
-        piece.row = new_x
-        self.board[new_y][new_x] = piece
-        erase_square(screen, piece)
-        piece.draw(screen, length)
-        self.remove_from_list(piece.color, new_y, new_x)
-        piece.moved = True
-        self.turns_passed += 1
-        if isinstance(piece, Pawn):
-            piece = self.pawn_to_queen(screen, piece)
+        self.draw_move(screen, self.history[-1])
+        piece = self.board[new_y][new_x]
         if self.opponent_in_check(piece, self.board):
             if self.checkmate(piece):
                 draw_checkmate(screen)
@@ -170,363 +101,116 @@ class Chess:
                 draw_check(screen)  # change this around
         return True
 
-    # Removes a piece from its list if it is captured.
-    def remove_from_list(self, capturing_color, column, row):
-        if capturing_color == Color.BLACK:
-            for piece in self.white_pieces:
-                if piece.column == column and piece.row == row:
-                    self.white_pieces.remove(piece)
-        else:
-            for piece in self.black_pieces:
-                if piece.column == column and piece.row == row:
-                    self.black_pieces.remove(piece)
-
-    # Check if the move will place yourself in check...
-    # If true, do not allow for the move....
-    # First, move the piece to the desired location.
-    # Then, cycle through enemy pieces and see if they can attack the king.
-    # Then move the piece back, as well as any piece that was at that location.
-    # If the offending piece would be captured, don't check for it.
-    # This is called before we check can_move.
-    # Also factor in special moves.
-    def self_in_check(self, piece, new_y, new_x):
-        current_y = piece.column
-        current_x = piece.row
-        temp = self.board[new_y][new_x]
-        self.board[current_y][current_x] = None
-        self.board[new_y][new_x] = piece
-        check = False
-        if piece.color == Color.BLACK:
-            pieces = self.white_pieces
-            king = self.black_king
-        else:
-            pieces = self.black_pieces
-            king = self.white_king
-        if piece is king:
-            king.column = new_y
-            king.row = new_x
-        for p in pieces:
-            if p.column != new_y or p.row != new_x:
-                if p.place_check(self.board, king.column, king.row):
-                    check = True
-                    break
-        if piece is king:
-            king.column = current_y
-            king.row = current_x
-        self.board[current_y][current_x] = piece
-        self.board[new_y][new_x] = temp
-        return check
-
-    # Check if moving this piece will place your opponent in check...
-    # Call AFTER moving your piece.
-    # Cycle to see if any of your pieces will place the opponent in check.
-    # Also factor in special moves.
-    def opponent_in_check(self, piece, board):
-        if piece.color == Color.BLACK:
-            pieces = self.black_pieces
-            king = self.white_king
-        else:
-            pieces = self.white_pieces
-            king = self.black_king
-        for p in pieces:
-            if p.place_check(board, king.column, king.row):
-                return True
-        return False
-
-    # Check ONLY after check: Pass in the piece placing the king in check.
-    # First, check to see if the king can move to any surrounding squares and not be in check.
-    # If not, get the offending piece's type and coords from the list.
-    # See if any piece can move to block (or capture) it.
-    def checkmate(self, piece):
-        if piece.color == Color.BLACK:
-            pieces = self.white_pieces
-            king = self.white_king
-        else:
-            pieces = self.black_pieces
-            king = self.black_king
-        if self.can_king_move(king):
-            return False
-        elif isinstance(piece, Rook):
-            return not self.can_block_rook(piece, king, pieces)
-        elif isinstance(piece, Bishop):
-            return not self.can_block_bishop(piece, king, pieces)
-        elif isinstance(piece, Queen):
-            return not self.can_block_queen(piece, king, pieces)
-        elif isinstance(piece, Knight):
-            return not self.can_capture_knight(piece, pieces)
-        return True
-
-    # Method to check if the king can move out of the way of check.
-    # Cycle through the 3x3 square around the king and see if he can move:
-    # 1.) Check to make sure the king is not on the edge of the map
-    # 2.) Check to see if the king can normally move there
-    # 3.) See if the king can move there and not be in check
-    def can_king_move(self, king):
-        king_y = king.column
-        king_x = king.row
-        for i in range(king_y - 1, king_y + 2):
-            for j in range(king_x - 1, king_x + 2):
-                if 0 <= i < NUM_SQUARES and 0 <= j < NUM_SQUARES and \
-                        king.can_move(self.board, i, j):
-                    print(str(i) + "," + str(j))
-                    if not self.self_in_check(king, i, j):
-                        return True
-        return False
-
-    # 1.) Check which direction the rook is placing the king in check from
-    # 2.) Check for each space between the king (exclusive) and rook (inclusive)
-    # if any piece can move there and if that move won't be check.
-    def can_block_rook(self, rook, king, pieces):
-        king_y = king.column
-        king_x = king.row
-        rook_y = rook.column
-        rook_x = rook.row
-        if rook_y == king_y:
-            if rook_x > king_x:
-                roof = rook_x + 1
-                floor = king_x
-            else:
-                roof = king_x + 1
-                floor = rook_x
-            for x in range(floor, roof):
-                for piece in pieces:
-                    if piece.can_move(self.board, rook_y, x) and \
-                            not self.self_in_check(piece, rook_y, x):
-                        return True
-        else:
-            if rook_y > king_y:
-                roof = rook_y + 1
-                floor = king_y
-            else:
-                roof = king_y + 1
-                floor = rook_y
-            for y in range(floor, roof):
-                for piece in pieces:
-                    if piece.can_move(self.board, y, rook_x) and \
-                            not self.self_in_check(piece, y, rook_x):
-                        return True
-        self.in_checkmate = True
-        return False
-
-    # Compare the bishop's location to the king's and see if a piece can either
-    # capture the bishop or move between the king and bishop.
-    def can_block_bishop(self, bishop, king, pieces):
-        king_y = king.column
-        king_x = king.row
-        bishop_y = bishop.column
-        bishop_x = bishop.row
-        if bishop_y > king_y:
-            if bishop_x > king_x:
-                floor_col = king_y
-                floor_row = king_x
-                roof_col = bishop_y
-                roof_row = bishop_x
-            else:
-                floor_col = king_y
-                floor_row = bishop_x
-                roof_col = bishop_y
-                roof_row = king_x
-        else:
-            if bishop_x > king_x:
-                floor_col = bishop_y
-                floor_row = king_x
-                roof_col = king_y
-                roof_row = bishop_x
-            else:
-                floor_col = bishop_y
-                floor_row = bishop_x
-                roof_col = king_y
-                roof_row = king_x
-        return self.bishop_block_helper(floor_col, floor_row, roof_col, roof_row, pieces)
-
-    # Deduces which direction the king is from the bishop and produces iterators
-    # then checks each square between the bishop (inclusive) and the king (exclusive)
-    # to see if a piece can capture the bishop or block it from taking the king.
-    def bishop_block_helper(self, floor_col, floor_row, roof_col, roof_row, pieces):
-        column_iterator = int((roof_col - floor_col) / abs(roof_col - floor_col))
-        row_iterator = int((roof_row - floor_row) / abs(roof_row - floor_row))
-        i = int(floor_col)
-        j = int(floor_row)
-        while i != roof_col + column_iterator and j != roof_row + row_iterator:
-            for piece in pieces:
-                if piece.can_move(self.board, i, j) and \
-                        not self.self_in_check(piece, i, j):
-                    return True
-            i += column_iterator
-            j += row_iterator
-        self.in_checkmate = True
-        return False
-
-    # Tests to see if a piece can block or capture the queen to prevent checkmate.
-    # Because the queen moves like a rook or bishop, we treat her as one, depending
-    # on the direction she is attacking the king from.
-    def can_block_queen(self, queen, king, pieces):
-        if queen.column == king.column or \
-                queen.row == king.row:
-            return self.can_block_rook(queen, king, pieces)
-        return self.can_block_bishop(queen, king, pieces)
-
-    # See if anyone can capture the knight, and the piece moving to capture the knight
-    # will not leave the king in check.
-    def can_capture_knight(self, knight, pieces):
-        knight_y = knight.column
-        knight_x = knight.row
-        for piece in pieces:
-            if piece.can_move(self.board, knight_y, knight_x) and \
-                    not self.self_in_check(piece, knight_y, knight_x):
-                return True
-        self.in_checkmate = True
-        return False
-
-    # Is the king in his starting spot?
-    # Is the rook in his starting spot?
-    # Are the column and row suitable for castling?
-    def castle(self, screen, new_y):
-        if self.turn == Color.WHITE:
-            return self.white_castle(screen, new_y)
-        return self.black_castle(screen, new_y)
-
-    # Specifically to test if the white king can castle:
-    # Is the king in his starting spot?
-    # Is the rook in his starting spot?
-    # Are the column and row suitable for castling
-    def white_castle(self, screen, new_y):
-        last_index = NUM_SQUARES - 1
-        if self.board[7][4] is self.white_king and new_y == last_index and \
-                isinstance(self.board[last_index][last_index], Rook) and \
-                self.board[7][7].color == Color.WHITE and \
-                self.move_piece(screen, self.board[last_index][last_index], (5 * length, last_index * length)):
-            self.turn = Color.WHITE
-            return True
-        return False
-
-    # Specifically to test if the black king can castle:
-    # Is the king in his starting spot?
-    # Is the rook in his starting spot?
-    # Are the column and row suitable for castling
-    def black_castle(self, screen, new_y):
-        last_index = NUM_SQUARES - 1
-        if self.board[0][4] is self.black_king and new_y == 0 and \
-                isinstance(self.board[0][last_index], Rook) and \
-                self.board[0][last_index].color == Color.BLACK and \
-                self.move_piece(screen, self.board[0][last_index], (5 * length, 0)):
-            self.turn = Color.BLACK
-            return True
-        return False
-
-    # Check to see if the piece is a pawn moving up 2 spaces from the front line.
-    # Check to see if neighbors exist and if they're pawns of a different color.
-    # If so, set their can_en_passant to true.
-    def set_en_passant(self, piece, column):
-        if isinstance(piece, Pawn) and \
-                (piece.column + 2 or piece.column - 2 == column):
-            if piece.row - 1 >= 0 and \
-                    isinstance(self.board[column][piece.row - 1], Pawn) and \
-                    self.board[column][piece.row - 1].color != piece.color:
-                piece.receive_passant(True)
-                self.passant_q.put(piece)
-            elif piece.row + 1 < NUM_SQUARES and \
-                    isinstance(self.board[column][piece.row + 1], Pawn) and \
-                    self.board[column][piece.row + 1].color != piece.color:
-                piece.receive_passant(True)
-                self.passant_q.put(piece)
-
-    # Because chess rules allow a pawn to en passant only during the turn after the
-    # opponent's pawn moves, the queue of pawns that may en passant is emptied afterwards.
-    def empty_passants(self):
-        while not self.passant_q.empty():
-            self.passant_q.get().receive_passant(False)
-
-    # Check to see if the piece's neighbors exist,
-    # if the neighbors are pawns,
-    # and if they may be captured via en passant.
-    def make_passant(self, screen, piece):
-        if isinstance(piece, Pawn):
-            if piece.row != 0 and \
-                    isinstance(self.board[piece.column][piece.row - 1], Pawn) and \
-                    self.board[piece.column][piece.row - 1].can_be_passant:
-                erase_square(screen, self.board[piece.column][piece.row - 1])
-                self.board[piece.column][piece.row - 1] = None
-                return True
-            elif piece.row != NUM_SQUARES - 1 and \
-                    isinstance(self.board[piece.column][piece.row + 1], Pawn) and \
-                    self.board[piece.column][piece.row + 1].can_be_passant:
-                erase_square(screen, self.board[piece.column][piece.row + 1])
-                self.board[piece.column][piece.row + 1] = None
-                return True
-        return False
-
-    # Be sure to run check over the new queen.
-    # Call after the pawn has moved.
-    # Remove the pawn from the list and the gui.
-    # Then give a queen the pawn's coords, add her to the list and gui.
-    def pawn_to_queen(self, screen, pawn):
-        pawn_y = pawn.column
-        pawn_x = pawn.row
-        if pawn.color == Color.BLACK and pawn_y == NUM_SQUARES - 1:
-            self.black_pieces.remove(pawn)
-            erase_square(screen, pawn)
-            self.board[pawn_y][pawn_x] = Queen(Color.BLACK, pawn_y, pawn_x, images["black_queen"])
-            self.black_pieces.append(self.board[pawn_y][pawn_x])
-            self.board[pawn_y][pawn_x].draw(screen, length)
-        elif pawn.color == Color.WHITE and pawn_y == 0:
-            self.white_pieces.remove(pawn)
-            erase_square(screen, pawn)
-            self.board[pawn_y][pawn_x] = Queen(Color.WHITE, pawn_y, pawn_x, images["white_queen"])
-            self.white_pieces.append(self.board[pawn_y][pawn_x])
-            self.board[pawn_y][pawn_x].draw(screen, length)
-        pawn = self.board[pawn_y][pawn_x]
-        return pawn
-
-    # Returns a list of pieces that the AI is allowed to move.
-    def get_ai_pieces(self):
-        return self.black_pieces
+    # Redraws the squares changed by a move, given its history record.
+    def draw_move(self, screen, record):
+        piece, old_y, old_x, moved, captured, captured_index, rook, rook_x, promoted = record[:9]
+        erase_square(screen, old_y, old_x)
+        if captured is not None:
+            erase_square(screen, captured.column, captured.row)
+        if rook is not None:
+            erase_square(screen, old_y, rook_x)
+            erase_square(screen, rook.column, rook.row)
+            draw_piece(screen, rook, length)
+        erase_square(screen, piece.column, piece.row)
+        draw_piece(screen, self.board[piece.column][piece.row], length)
+
+    # Draws a highlight around the selected piece's square, removing any earlier one.
+    def highlight(self, screen, piece):
+        global highlighted
+        self.clear_highlight(screen)
+        highlighted = (piece.column, piece.row)
+        rect = pygame.draw.rect(screen, HIGHLIGHT, (piece.row * length, piece.column * length, length, length), 5)
+        mark_dirty(rect)
+
+    # Removes the highlight by drawing its square again.
+    def clear_highlight(self, screen):
+        global highlighted
+        if highlighted is None:
+            return
+        column, row = highlighted
+        erase_square(screen, column, row)
+        if self.board[column][row] is not None:
+            draw_piece(screen, self.board[column][row], length)
+        highlighted = None
+
+
+# Loads and scales the sprites for squares of square_size, unless they already are.
+# The display mode has to be set first, since the sprites are converted to its pixel format.
+def load_sprites(square_size):
+    global sprite_size
+    if sprite_size == square_size:
+        return
+    for path in images.values():
+        picture = pygame.image.load(path)
+        sprites[path] = pygame.transform.scale(picture, (square_size, square_size)).convert_alpha()
+    sprite_size = square_size
+
+
+# Draws a piece on the GUI.
+# Square_size is the size of one square on the GUI board.
+def draw_piece(screen, piece, square_size):
+    load_sprites(square_size)
+    x_location = piece.row + (piece.row * (square_size - 1))
+    y_location = piece.column + (piece.column * (square_size - 1))
+    mark_dirty(screen.blit(sprites[piece.picture], (x_location, y_location)))
+
+
+# Marks a rectangle of the screen as changed, to be shown by the next update_display.
+def mark_dirty(rect):
+    dirty_rects.append(pygame.Rect(rect))
+
+
+# Shows everything drawn since the last call with a single partial update of the display.
+# Call once per frame.
+def update_display():
+    global display_updates, frame_time
+    if not dirty_rects:
+        return
+    start = time.perf_counter()
+    pygame.display.update(dirty_rects)
+    frame_time = time.perf_counter() - start
+    display_updates += 1
+    del dirty_rects[:]
 
 
 # Paints over any graphic that currently covers a square.
 # Primarily used to remove piece graphics when they move or are captured.
-def erase_square(screen, piece):
-    square = pygame.Surface((length, length))
-    if piece.column % 2 == 0:
-        if piece.row % 2 == 0:
-            square.fill(WHITE)
-        else:
-            square.fill(BLACK)
+def erase_square(screen, column, row):
+    if column % 2 == row % 2:
+        color = WHITE
     else:
-        if piece.row % 2 == 0:
-            square.fill(BLACK)
-        else:
-            square.fill(WHITE)
-    screen.blit(square, (piece.row * length, piece.column * length))
-    pygame.display.flip()
+        color = BLACK
+    mark_dirty(screen.fill(color, (row * length, column * length, length, length)))
 
 
 # Outputs "Check!" on the screen when a king is placed in check.
 # Centering the message:
 # Take the screen width / 2 and subtract message length / 2
+# The message is shown for a second, then the part of the board it covered is put back.
 def draw_check(screen):
-    copy = screen.copy()
     font = pygame.font.SysFont("Arial Black", 50)
     text_color = (150, 150, 0)
     check = font.render("Check!", False, text_color)
     message_x = screen_size[0] / 2 - check.get_width() / 2
-    screen.blit(check, (message_x, 200))
-    pygame.display.flip()
+    rect = check.get_rect(topleft=(message_x, 200)).clip(screen.get_rect())
+    covered = screen.subsurface(rect).copy()
+    mark_dirty(screen.blit(check, (message_x, 200)))
+    update_display()
     time.sleep(1)
-    screen.blit(copy, (0, 0))
+    mark_dirty(screen.blit(covered, rect))
 
 
 # Outputs "Checkmate!" on the screen when a king is placed in checkmate.
-def draw_checkmate(screen):
+# A stalemate ends the game the same way, with message "Stalemate!".
+def draw_checkmate(screen, message="Checkmate!"):
     font = pygame.font.SysFont("Arial Black", 50)
     text_color = (150, 150, 0)
-    checkmate = font.render("Checkmate!", False, text_color)
+    checkmate = font.render(message, False, text_color)
     checkmate_x = screen_size[0] / 2 - checkmate.get_width() / 2
     play_again = font.render("Play Again? <Y/N>", False, text_color)
     play_again_x = screen_size[0] / 2 - play_again.get_width() / 2
-    screen.blit(checkmate, (checkmate_x, 125))
-    screen.blit(play_again, (play_again_x, 200))
-    pygame.display.flip()
+    mark_dirty(screen.blit(checkmate, (checkmate_x, 125)))
+    mark_dirty(screen.blit(play_again, (play_again_x, 200)))
 
 
 # Draws an empty checkerboard.
@@ -550,6 +234,7 @@ def draw_squares(screen, size):
             j += size
         color = not color
         i += size
+    mark_dirty(screen.get_rect())
 
 
 # When the program opens, draw a screen asking if there are one or two players
@@ -602,13 +287,104 @@ def take_turn(screen, game, selected_piece):
     if game.player_move:
         piece = player_turn(screen, game, selected_piece)
     if not game.player_move and not game.in_checkmate:
-        global last_screen
-        last_screen = screen.copy()
-        ai.mini_max(game, 4, screen)
+        # The AI thinks in the background; main plays its move once it is found.
+        # If it was pondering the move just played, it carries on with that search instead
+        global search
+        search = take_ponder_search(game)
+        if search is None:
+            search = ai.BackgroundSearch(game, ai.MAX_DEPTH, time_limit=think_time)
     else:
+        if game.in_checkmate:
+            cancel_search()
         return piece
 
 
+# Plays the move the background search found, once it has finished.
+# If the AI has no legal move it is stalemated, since checkmates are found as the human moves,
+# and the game ends the way a checkmate does.
+def finish_ai_turn(screen, game):
+    global search
+    move = search.result
+    search = None
+    set_caption("Chess")
+    if move is None:
+        game.player_move = True
+        game.in_checkmate = True
+        draw_checkmate(screen, "Stalemate!")
+        return
+    # move_piece takes the position as a square, not a point on the screen, while it is the AI's move
+    game.move_piece(screen, piece=move[1], position=move[2][1])
+    game.player_move = True
+    start_ponder_search(game, move)
+
+
+# Starts pondering on the human's reply that the AI's move expects, if there is one.
+def start_ponder_search(game, move):
+    global ponder_search
+    if not pondering or num_players != 1 or game.in_checkmate or len(move) < 4 or len(move[3]) < 2:
+        return
+    # The principal variation belongs to the search's copy of the game, whose pieces are back where they started
+    piece, target = move[3][1][0], move[3][1][1]
+    ponder_search = ai.BackgroundSearch(game, ai.MAX_DEPTH, time_limit=think_time,
+                                        ponder_move=(game.board[piece.column][piece.row], target))
+
+
+# Called once the human has moved. Returns the ponder search if the human played the move it
+# pondered on, now running against its time limit, or cancels it and returns None otherwise.
+def take_ponder_search(game):
+    global ponder_search, ponder_hits, ponder_misses, ponder_time_saved
+    if ponder_search is None:
+        return None
+    found = ponder_search
+    ponder_search = None
+    piece, target = found.ponder_move
+    record = game.history[-1]
+    if record[0] is piece and (piece.column, piece.row) == target:
+        ponder_hits += 1
+        ponder_time_saved += found.ponder_hit()
+        return found
+    ponder_misses += 1
+    found.cancel()
+    return None
+
+
+# Returns a one line summary of how often the human played the move the AI pondered on,
+# and the time that saved.
+def ponder_report():
+    total = ponder_hits + ponder_misses
+    return "pondering: {} hits out of {} moves ({:.1%}), {:.1f}s saved".format(
+        ponder_hits, total, ponder_hits / total if total else 0.0, ponder_time_saved)
+
+
+# Shows how far along the AI is in the window title.
+def draw_progress():
+    progress = search.progress()
+    text = "Chess - thinking, depth {}".format(ai.depth_reached)
+    if progress is not None:
+        text += ", {:.0%} of {}s".format(progress, think_time)
+    set_caption(text)
+
+
+# Changes the window title, if it isn't already showing this text.
+def set_caption(text):
+    global caption
+    if text != caption:
+        caption = text
+        pygame.display.set_caption(text)
+
+
+# Stops the AI if it is thinking or pondering, without playing its move.
+def cancel_search():
+    global search, ponder_search
+    if ponder_search is not None:
+        ponder_search.cancel()
+        ponder_search = None
+    if search is not None:
+        search.cancel()
+        search = None
+        set_caption("Chess")
+
+
 # If a piece is selected, then move it.
 # Otherwise, continue to try and select a piece.
 # This method exists specifically for a player to select a piece from the GUI
@@ -617,17 +393,12 @@ def player_turn(screen, game, selected_piece):
     if selected_piece is not None and ((num_players == 2 and game.turn == selected_piece.color)
                                        or (num_players == 1 and game.turn == Color.WHITE)):
         if game.move_piece(screen, selected_piece, position):
-            game.turn = Color.BLACK if game.turn == Color.WHITE else Color.WHITE
             if num_players == 1:
                 game.player_move = False
             return None
     selected_piece = game.select_piece(position)
     if selected_piece is not None:
-        global last_screen
-        last_screen = screen.copy()
-        top_left_x = selected_piece.row * length
-        top_left_y = selected_piece.column * length
-        pygame.draw.rect(screen, HIGHLIGHT, (top_left_x, top_left_y, length, length), 5)
+        game.highlight(screen, selected_piece)
     return selected_piece
 
 
@@ -640,6 +411,7 @@ def main():
     fps = 60
     screen = pygame.display.set_mode(screen_size)
     pygame.display.set_caption("Chess")
+    load_sprites(length)
     select_players(screen)
     draw_squares(screen, length)
     game = Chess()
@@ -647,22 +419,31 @@ def main():
     run = True
     selected_piece = None
     while run:
-        pygame.display.flip()
+        if search is not None:
+            if search.done():
+                finish_ai_turn(screen, game)
+            else:
+                draw_progress()
+        update_display()
         clock.tick(fps)
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                cancel_search()
                 run = False
-            elif event.type == pygame.MOUSEBUTTONUP and not game.in_checkmate:
+            elif event.type == pygame.MOUSEBUTTONUP and not game.in_checkmate and search is None:
                 selected_piece = take_turn(screen, game, selected_piece)
             elif event.type == pygame.KEYDOWN and game.in_checkmate:
                 if event.key == pygame.K_n:
                     run = False
                 if event.key == pygame.K_y:
+                    cancel_search()
                     draw_squares(screen, length)
                     game = Chess()
                     game.draw_pieces(screen)
                     selected_piece = None
     pygame.quit()
+    if ponder_hits + ponder_misses:
+        print(ponder_report())
 
 
 if __name__ == '__main__':
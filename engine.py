@@ -0,0 +1,887 @@
+import evaluation
+import zobrist
+from pieces.rook import Rook
+from pieces.knight import Knight, KNIGHT_MOVES
+from pieces.bishop import Bishop
+from pieces.queen import Queen, DIAGONAL_RAYS, HORIZONTAL_RAYS, QUEEN_RAYS, BETWEEN
+from pieces.king import King, KING_MOVES
+from pieces.pawn import Pawn, PAWN_CAPTURES
+from pieces.piece import Color
+
+NUM_SQUARES = 8
+FILES = "abcdefgh"
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# Pieces a pawn may promote to. A (piece, (column, row)) move promotes to the first one;
+# a (piece, (column, row), piece_class) move names any of them.
+PROMOTIONS = (Queen, Rook, Bishop, Knight)
+
+# Ray tables (see pieces.queen) of the lines a piece can be attacked or pinned along,
+# with the sliding pieces that attack along them.
+LINES = ((HORIZONTAL_RAYS, (Rook, Queen)), (DIAGONAL_RAYS, (Bishop, Queen)))
+
+# Ray table each sliding piece moves and attacks along.
+SLIDER_RAYS = {Rook: HORIZONTAL_RAYS, Bishop: DIAGONAL_RAYS, Queen: QUEEN_RAYS}
+
+# Sprite of each piece, relative to the repository root.
+# Pieces only remember the path: the GUI in chess.py loads the image when it draws one.
+images = {
+    "black_pawn": "sprites/black_pawn.png",
+    "black_rook": "sprites/black_rook.png",
+    "black_knight": "sprites/black_knight.png",
+    "black_bishop": "sprites/black_bishop.png",
+    "black_queen": "sprites/black_queen.png",
+    "black_king": "sprites/black_king.png",
+    "white_pawn": "sprites/white_pawn.png",
+    "white_rook": "sprites/white_rook.png",
+    "white_knight": "sprites/white_knight.png",
+    "white_bishop": "sprites/white_bishop.png",
+    "white_queen": "sprites/white_queen.png",
+    "white_king": "sprites/white_king.png"
+}
+
+# Letters standing for each piece class in snapshots.
+PIECE_LETTERS = {Pawn: "p", Knight: "n", Bishop: "b", Rook: "r", Queen: "q", King: "k"}
+PIECE_CLASSES = {letter: piece_class for piece_class, letter in PIECE_LETTERS.items()}
+
+
+# Returns the name of a square, such as "e4". Rank 8 is column 0 of the board and file a is row 0.
+def square_name(column, row):
+    return FILES[row] + str(NUM_SQUARES - column)
+
+
+# Returns the (column, row) of a square's name.
+def parse_square(name):
+    return NUM_SQUARES - int(name[1]), FILES.index(name[0])
+
+
+# The chess class contains groupings of functions and objects pertaining to the inner workings of the
+# chess game, primarily in regards to moving pieces around the game board.
+# Nothing here draws or loads images, so games can be played and searched without pygame:
+# chess.Chess adds the GUI on top.
+class Chess:
+
+    # Pieces are stored in lists to more quickly access them: one for each color,
+    # and one for each color and type of piece (see pieces_of_type).
+    # Each piece remembers its index in its lists so it can be removed without a scan.
+    # Pieces are stored in a 2D array to more quickly work with piece location: it is the index
+    # from squares to pieces.
+    # Pointers to kings are saved in order to improve the efficiency of castling and check.
+    def __init__(self):
+        self.board = [[None for i in range(NUM_SQUARES)] for j in range(NUM_SQUARES)]
+        self.place_pieces(Color.BLACK)
+        self.place_pieces(Color.WHITE)
+        self.clear_piece_lists()
+        self.pieces_to_list(Color.BLACK)
+        self.pieces_to_list(Color.WHITE)
+        self.white_king = self.board[7][4]
+        self.black_king = self.board[0][4]
+        self.passant_pawn = None
+        self.history = []
+        self.turn = Color.WHITE
+        self.in_checkmate = False
+        self.player_move = True
+        self.turns_passed = 0
+        self.halfmove_clock = 0
+        self.zobrist_key = self.compute_zobrist()
+        self.compute_scores()
+        self.compute_attacks()
+
+    # Returns a game without a position, for set_position to fill in.
+    # Skips setting up the starting position the way __init__ does.
+    @classmethod
+    def blank(cls):
+        game = cls.__new__(cls)
+        game.player_move = True
+        return game
+
+    # Returns a compact, picklable description of the position, for sending it to another process:
+    # a tuple of (piece letter, color value, column, row, moved) for each piece in list order,
+    # the square of the passant pawn or None, the color value of the side to move, turns_passed
+    # and the halfmove clock.
+    def snapshot(self):
+        pieces = tuple((PIECE_LETTERS[type(piece)], piece.color.value, piece.column, piece.row, piece.moved)
+                       for piece in self.white_pieces + self.black_pieces)
+        passant = None
+        if self.passant_pawn is not None:
+            passant = (self.passant_pawn.column, self.passant_pawn.row)
+        return pieces, passant, self.turn.value, self.turns_passed, self.halfmove_clock
+
+    # Builds a game from the result of snapshot.
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        pieces, passant, turn, turns_passed, halfmove_clock = snapshot
+        game = cls.blank()
+        game.set_position([(PIECE_CLASSES[letter], Color(color), column, row, moved)
+                           for letter, color, column, row, moved in pieces],
+                          passant, Color(turn), turns_passed, halfmove_clock)
+        return game
+
+    # Builds a game from a FEN string. Missing fields take their starting position values.
+    # Kings and rooks that have lost their castling rights count as moved, and the pawn behind an
+    # en passant target only becomes the passant pawn if an enemy pawn stands next to it.
+    @classmethod
+    def from_fen(cls, fen):
+        fields = fen.split()
+        turn = Color.BLACK if len(fields) > 1 and fields[1] == "b" else Color.WHITE
+        castling = fields[2] if len(fields) > 2 else "-"
+        target = fields[3] if len(fields) > 3 else "-"
+        halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        full_moves = int(fields[5]) if len(fields) > 5 else 1
+
+        pieces = []
+        for column, rank in enumerate(fields[0].split("/")):
+            row = 0
+            for char in rank:
+                if char.isdigit():
+                    row += int(char)
+                    continue
+                color = Color.WHITE if char.isupper() else Color.BLACK
+                piece_class = PIECE_CLASSES[char.lower()]
+                home = NUM_SQUARES - 1 if color == Color.WHITE else 0
+                king_side, queen_side = ("K", "Q") if color == Color.WHITE else ("k", "q")
+                moved = False
+                if piece_class is King:
+                    moved = (column, row) != (home, 4) or (king_side not in castling and queen_side not in castling)
+                elif piece_class is Rook:
+                    moved = not ((column, row) == (home, NUM_SQUARES - 1) and king_side in castling or
+                                 (column, row) == (home, 0) and queen_side in castling)
+                pieces.append((piece_class, color, column, row, moved))
+                row += 1
+
+        passant = None
+        if target != "-":
+            column, row = parse_square(target)
+            column += -1 if turn == Color.BLACK else 1
+            enemy = Color.BLACK if turn == Color.BLACK else Color.WHITE
+            for piece_class, color, other_column, other_row, moved in pieces:
+                if piece_class is Pawn and color == enemy and other_column == column and abs(other_row - row) == 1:
+                    passant = (column, row)
+
+        game = cls.blank()
+        game.set_position(pieces, passant, turn, 2 * (full_moves - 1) + (1 if turn == Color.BLACK else 0),
+                          halfmove_clock)
+        return game
+
+    # Returns the position as a FEN string.
+    # The en passant target is only given while the passant pawn can actually be captured.
+    def to_fen(self):
+        ranks = []
+        for column in range(NUM_SQUARES):
+            rank = ""
+            empty = 0
+            for row in range(NUM_SQUARES):
+                piece = self.board[column][row]
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty > 0:
+                    rank += str(empty)
+                    empty = 0
+                letter = PIECE_LETTERS[type(piece)]
+                rank += letter.upper() if piece.color == Color.WHITE else letter
+            if empty > 0:
+                rank += str(empty)
+            ranks.append(rank)
+
+        castling = ""
+        for color, column, king in ((Color.WHITE, NUM_SQUARES - 1, self.white_king), (Color.BLACK, 0, self.black_king)):
+            if self.board[column][4] is king and not king.moved:
+                for letter, row in (("k", NUM_SQUARES - 1), ("q", 0)):
+                    rook = self.board[column][row]
+                    if isinstance(rook, Rook) and rook.color == color and not rook.moved:
+                        castling += letter.upper() if color == Color.WHITE else letter
+
+        target = "-"
+        if self.passant_pawn is not None:
+            behind = self.passant_pawn.column + (1 if self.passant_pawn.color == Color.WHITE else -1)
+            target = square_name(behind, self.passant_pawn.row)
+
+        return "{} {} {} {} {} {}".format("/".join(ranks), "w" if self.turn == Color.WHITE else "b",
+                                          castling or "-", target, self.halfmove_clock, self.turns_passed // 2 + 1)
+
+    # Replaces the position with the given pieces, each a (piece class, color, column, row, moved) tuple.
+    # Passant is the (column, row) of the pawn that may be captured en passant, or None.
+    # The halfmove clock counts the moves since the last capture or pawn move.
+    # The piece lists, kings, history, Zobrist key and evaluation terms are all rebuilt.
+    def set_position(self, pieces, passant, turn, turns_passed, halfmove_clock=0):
+        self.board = [[None for i in range(NUM_SQUARES)] for j in range(NUM_SQUARES)]
+        self.clear_piece_lists()
+        for piece_class, color, column, row, moved in pieces:
+            piece = piece_class(color, column, row, images[color.name.lower() + "_" + piece_class.__name__.lower()])
+            piece.moved = moved
+            self.board[column][row] = piece
+            self.add_piece(piece)
+            if piece_class is King:
+                if color == Color.WHITE:
+                    self.white_king = piece
+                else:
+                    self.black_king = piece
+        self.passant_pawn = None
+        if passant is not None:
+            self.passant_pawn = self.board[passant[0]][passant[1]]
+            self.passant_pawn.receive_passant(True)
+        self.history = []
+        self.turn = turn
+        self.in_checkmate = False
+        self.turns_passed = turns_passed
+        self.halfmove_clock = halfmove_clock
+        self.zobrist_key = self.compute_zobrist()
+        self.compute_scores()
+        self.compute_attacks()
+
+    # Computes the Zobrist key of the position from scratch: every piece on its square,
+    # castling and en passant state, and the side to move (self.turn unless color is given).
+    # The search updates self.zobrist_key incrementally instead of calling this.
+    def compute_zobrist(self, color=None):
+        key = self.state_key()
+        for piece in self.white_pieces + self.black_pieces:
+            key ^= zobrist.piece_key(piece, piece.column, piece.row)
+        if (color or self.turn) == Color.BLACK:
+            key ^= zobrist.SIDE_KEY
+        return key
+
+    # Computes the running evaluation terms from scratch: self.scores holds the (opening, middle game,
+    # endgame) material and piece-square scores, and self.phase_material the material that decides
+    # the phase of the game. make_move and unmake_move keep them up to date instead of calling this.
+    def compute_scores(self):
+        self.scores = [0] * evaluation.NUM_PHASES
+        self.phase_material = 0
+        for piece in self.white_pieces + self.black_pieces:
+            self.add_scores(piece, piece.column, piece.row, 1)
+
+    # Adds the scores of a piece on a square to the running evaluation terms,
+    # or takes them away if sign is -1.
+    def add_scores(self, piece, column, row, sign):
+        scores = evaluation.piece_scores(piece, column, row)
+        for phase in range(evaluation.NUM_PHASES):
+            self.scores[phase] += sign * scores[phase]
+        self.phase_material += sign * evaluation.PHASE_VALUES[type(piece)]
+
+    # Computes the attack maps from scratch. Each piece's attacks holds the mask of squares it attacks
+    # (see attack_mask), self.attack_counts[color] how many of a side's pieces attack each square,
+    # and self.attacked[color] the mask of squares a side attacks at all.
+    # make_move and unmake_move keep them up to date instead of calling this.
+    def compute_attacks(self):
+        self.attack_counts = {Color.WHITE: [0] * NUM_SQUARES ** 2, Color.BLACK: [0] * NUM_SQUARES ** 2}
+        self.attacked = {Color.WHITE: 0, Color.BLACK: 0}
+        for piece in self.white_pieces + self.black_pieces:
+            piece.attacks = 0
+            self.set_attacks(piece, self.attack_mask(piece))
+
+    # Returns the squares a piece attacks as a mask with bit column * 8 + row set for each.
+    # These are the squares it could capture on, and include squares holding its own pieces, which it defends.
+    # Pawns attack diagonally forwards, castling attacks nothing, and sliding pieces attack
+    # along each line up to and including the first piece in the way.
+    def attack_mask(self, piece):
+        mask = 0
+        piece_class = type(piece)
+        if piece_class is Pawn:
+            targets = PAWN_CAPTURES[piece.color][piece.column][piece.row]
+        elif piece_class is Knight:
+            targets = KNIGHT_MOVES[piece.column][piece.row]
+        elif piece_class is King:
+            targets = KING_MOVES[piece.column][piece.row]
+        else:
+            board = self.board
+            for ray in SLIDER_RAYS[piece_class][piece.column][piece.row]:
+                for column, row in ray:
+                    mask |= 1 << (column * NUM_SQUARES + row)
+                    if board[column][row] is not None:
+                        break
+            return mask
+        for column, row in targets:
+            mask |= 1 << (column * NUM_SQUARES + row)
+        return mask
+
+    # Replaces the mask of squares a piece attacks, updating its side's attack counts
+    # and attacked squares for the squares it gains and loses.
+    def set_attacks(self, piece, mask):
+        counts = self.attack_counts[piece.color]
+        attacked = self.attacked[piece.color]
+        lost = piece.attacks & ~mask
+        while lost:
+            bit = lost & -lost
+            square = bit.bit_length() - 1
+            counts[square] -= 1
+            if counts[square] == 0:
+                attacked ^= bit
+            lost ^= bit
+        gained = mask & ~piece.attacks
+        while gained:
+            bit = gained & -gained
+            square = bit.bit_length() - 1
+            counts[square] += 1
+            if counts[square] == 1:
+                attacked |= bit
+            gained ^= bit
+        self.attacked[piece.color] = attacked
+        piece.attacks = mask
+
+    # Returns the mask of squares the given color attacks, with bit column * 8 + row set for each.
+    def attacks(self, color):
+        return self.attacked[color]
+
+    # Returns how many of the given color's pieces attack a square.
+    def attackers(self, column, row, color):
+        return self.attack_counts[color][column * NUM_SQUARES + row]
+
+    # Is the square attacked by a piece of the given color?
+    def square_attacked(self, column, row, color):
+        return self.attacked[color] >> (column * NUM_SQUARES + row) & 1 == 1
+
+    # Returns the part of the Zobrist key describing castling and en passant state.
+    # A side may castle to a corner while its king and that corner's rook are unmoved on their
+    # starting squares, and the passant pawn may be captured en passant.
+    def state_key(self):
+        key = 0
+        for color, column, king in ((Color.WHITE, NUM_SQUARES - 1, self.white_king), (Color.BLACK, 0, self.black_king)):
+            if self.board[column][4] is king and not king.moved:
+                for side, row in ((0, NUM_SQUARES - 1), (1, 0)):
+                    rook = self.board[column][row]
+                    if isinstance(rook, Rook) and rook.color == color and not rook.moved:
+                        key ^= zobrist.CASTLING_KEYS[color][side]
+        if self.passant_pawn is not None:
+            key ^= zobrist.EN_PASSANT_KEYS[self.passant_pawn.row]
+        return key
+
+    # Counts the moves a side's pieces can make, for the evaluation.
+    # Checks are found with the attack maps instead (see square_attacked).
+    # Use ai.mobility_cache instead of calling this directly, so the result is shared.
+    def mobility(self, color):
+        mobility = 0
+        for piece in self.pieces_of(color):
+            mobility += len(piece.available_moves(self.board))
+        return mobility
+
+    # Places the pieces in the 2D array.
+    # NOT on the board GUI.
+    def place_pieces(self, color):
+        column = 0
+        color_string = "black"
+        if color == Color.WHITE:
+            column = 7
+            color_string = "white"
+        self.board[column][0] = Rook(color, column, 0, images[color_string + "_rook"])
+        self.board[column][1] = Knight(color, column, 1, images[color_string + "_knight"])
+        self.board[column][2] = Bishop(color, column, 2, images[color_string + "_bishop"])
+        self.board[column][3] = Queen(color, column, 3, images[color_string + "_queen"])
+        self.board[column][4] = King(color, column, 4, images[color_string + "_king"])
+        self.board[column][5] = Bishop(color, column, 5, images[color_string + "_bishop"])
+        self.board[column][6] = Knight(color, column, 6, images[color_string + "_knight"])
+        self.board[column][7] = Rook(color, column, 7, images[color_string + "_rook"])
+        if color == Color.BLACK:
+            column = 1
+        else:
+            column = 6
+        for i in range(0, NUM_SQUARES):
+            self.board[column][i] = Pawn(color, column, i, images[color_string + "_pawn"])
+
+    # Adds white pieces to the white list, and black pieces to the black list.
+    def pieces_to_list(self, color):
+        if color == Color.BLACK:
+            for i in range(0, 2):
+                for j in range(0, NUM_SQUARES):
+                    self.add_piece(self.board[i][j])
+        else:
+            for i in range(6, NUM_SQUARES):
+                for j in range(0, NUM_SQUARES):
+                    self.add_piece(self.board[i][j])
+
+    # Empties the piece lists of both colors and of every type of piece.
+    def clear_piece_lists(self):
+        self.white_pieces = []
+        self.black_pieces = []
+        self.piece_types = {color: {piece_class: [] for piece_class in PIECE_LETTERS} for color in Color}
+
+    # Returns the list holding pieces of the given color.
+    def pieces_of(self, color):
+        return self.white_pieces if color == Color.WHITE else self.black_pieces
+
+    # Returns the list holding the given color's pieces of one type, such as its knights.
+    def pieces_of_type(self, color, piece_class):
+        return self.piece_types[color][piece_class]
+
+    # Appends a piece to its color's list and its type's list, recording its index in each.
+    def add_piece(self, piece):
+        pieces = self.pieces_of(piece.color)
+        piece.index = len(pieces)
+        pieces.append(piece)
+        pieces = self.piece_types[piece.color][type(piece)]
+        piece.type_index = len(pieces)
+        pieces.append(piece)
+
+    # Removes a piece from its lists in constant time by moving the last piece of each into its slot.
+    # Returns the index the piece had, so restore_piece can put everything back in order.
+    def remove_piece(self, piece):
+        pieces = self.pieces_of(piece.color)
+        index = piece.index
+        last = pieces.pop()
+        if last is not piece:
+            pieces[index] = last
+            last.index = index
+        self.remove_type(piece)
+        return index
+
+    # Undoes remove_piece: puts the piece back at its old indexes,
+    # and moves the pieces that took its slots back to the ends of the lists.
+    def restore_piece(self, piece, index):
+        pieces = self.pieces_of(piece.color)
+        if index < len(pieces):
+            moved = pieces[index]
+            moved.index = len(pieces)
+            pieces.append(moved)
+            pieces[index] = piece
+        else:
+            pieces.append(piece)
+        piece.index = index
+        self.restore_type(piece)
+
+    # Removes a piece from its type's list only, the way remove_piece does.
+    # The piece keeps its type_index for restore_type.
+    def remove_type(self, piece):
+        pieces = self.piece_types[piece.color][type(piece)]
+        last = pieces.pop()
+        if last is not piece:
+            pieces[piece.type_index] = last
+            last.type_index = piece.type_index
+
+    # Undoes remove_type.
+    def restore_type(self, piece):
+        pieces = self.piece_types[piece.color][type(piece)]
+        index = piece.type_index
+        if index < len(pieces):
+            moved = pieces[index]
+            moved.type_index = len(pieces)
+            pieces.append(moved)
+            pieces[index] = piece
+        else:
+            pieces.append(piece)
+
+    # In order to move:
+    # 1.) Check that the move is one of the piece's legal moves (see legal_targets)
+    # 2.) Make the move (see make_move)
+    # Returns False, leaving the game untouched, if the move is not allowed.
+    def play_move(self, piece, new_y, new_x):
+        if not self.is_legal((piece, (new_y, new_x))):
+            return False
+        self.make_move((piece, (new_y, new_x)))
+        return True
+
+    # Step 1 of play_move: can a (piece, (column, row)) move be played?
+    def is_legal(self, move):
+        checkers, evasions, pins = self.restrictions(move[0].color)
+        return move[1] in self.legal_targets(move[0], checkers, evasions, pins)
+
+    # Returns every move of the given color that play_move allows, as (piece, (column, row)) tuples.
+    # With underpromotions, a pawn reaching the far side also gets a
+    # (piece, (column, row), piece_class) move for each promotion other than the queen.
+    def legal_moves(self, color, underpromotions=False):
+        checkers, evasions, pins = self.restrictions(color)
+        moves = []
+        for piece in self.pieces_of(color):
+            for move in self.legal_targets(piece, checkers, evasions, pins):
+                moves.append((piece, move))
+                if underpromotions and isinstance(piece, Pawn) and (move[0] == 0 or move[0] == NUM_SQUARES - 1):
+                    for promotion in PROMOTIONS[1:]:
+                        moves.append((piece, move, promotion))
+        return moves
+
+    # Returns the moves of the given color that capture an enemy piece, in the format of legal_moves,
+    # for the quiescence search. They are read off the attack maps instead of each piece's moves.
+    # En passant captures are left out.
+    def legal_captures(self, color):
+        checkers, evasions, pins = self.restrictions(color)
+        enemy = 0
+        for piece in self.pieces_of(Color.BLACK if color == Color.WHITE else Color.WHITE):
+            enemy |= 1 << (piece.column * NUM_SQUARES + piece.row)
+        moves = []
+        for piece in self.pieces_of(color):
+            targets = piece.attacks & enemy
+            if not targets:
+                continue
+            if isinstance(piece, King):
+                targets &= ~self.unsafe_squares(piece, checkers)
+                pin = None
+            elif evasions is not None and not evasions:
+                continue
+            else:
+                pin = pins.get(piece)
+            while targets:
+                bit = targets & -targets
+                target = divmod(bit.bit_length() - 1, NUM_SQUARES)
+                if isinstance(piece, King) or \
+                        (evasions is None or target in evasions) and (pin is None or target in pin):
+                    moves.append((piece, target))
+                targets ^= bit
+        return moves
+
+    # Returns the square and value of the least valuable piece of the given color that attacks
+    # a square (column * 8 + row), or None if there is none, for ordering.static_exchange.
+    # The pieces on the squares in the removed mask have already captured on the square:
+    # they are left out, and no longer block the lines of the sliding pieces behind them.
+    def least_valuable_attacker(self, square, color, removed):
+        column, row = divmod(square, NUM_SQUARES)
+        for piece_class in evaluation.PIECE_CLASSES:
+            for piece in self.piece_types[color][piece_class]:
+                index = piece.column * NUM_SQUARES + piece.row
+                if removed >> index & 1:
+                    continue
+                if piece.attacks >> square & 1:
+                    return index, piece.val
+                if removed and piece_class in SLIDER_RAYS and \
+                        (piece_class is not Bishop and (piece.column == column or piece.row == row) or
+                         piece_class is not Rook and abs(piece.column - column) == abs(piece.row - row)):
+                    board = self.board
+                    if all(board[i][j] is None or removed >> (i * NUM_SQUARES + j) & 1
+                           for i, j in BETWEEN[index][square]):
+                        return index, piece.val
+        return None
+
+    # Works out, once per position, what limits the moves of the given color's pieces. Returns:
+    # the enemy pieces giving check,
+    # the squares a piece other than the king must move to in order to block or capture the checking
+    # piece (None when not in check, and empty in double check, when only the king may move),
+    # and a dictionary of pinned pieces, each with the squares along its pin it may still move to.
+    # Everything is found by looking outwards from the king, so no moves are tried.
+    def restrictions(self, color):
+        board = self.board
+        king = self.white_king if color == Color.WHITE else self.black_king
+        enemy = Color.BLACK if color == Color.WHITE else Color.WHITE
+        checkers = []
+        evasions = None
+        pins = {}
+
+        # Knights and pawns can only give check, so they are only looked for when the attack maps
+        # say the king is attacked
+        in_check = self.square_attacked(king.column, king.row, enemy)
+        if in_check:
+            for column, row in KNIGHT_MOVES[king.column][king.row]:
+                piece = board[column][row]
+                if isinstance(piece, Knight) and piece.color == enemy:
+                    checkers.append(piece)
+                    evasions = {(column, row)}
+
+            # Enemy pawns attack the king from the squares a pawn of its own color would capture on
+            for column, row in PAWN_CAPTURES[color][king.column][king.row]:
+                piece = board[column][row]
+                if isinstance(piece, Pawn) and piece.color == enemy:
+                    checkers.append(piece)
+                    evasions = {(column, row)}
+
+        for rays, sliders in LINES:
+            for ray in rays[king.column][king.row]:
+                squares = set()
+                pinned = None
+                for column, row in ray:
+                    squares.add((column, row))
+                    piece = board[column][row]
+                    if piece is not None:
+                        if piece.color == color:
+                            if pinned is not None:
+                                break
+                            pinned = piece
+                        else:
+                            if type(piece) in sliders:
+                                if pinned is None and in_check:
+                                    checkers.append(piece)
+                                    evasions = squares
+                                else:
+                                    pins[pinned] = squares
+                            break
+
+        if len(checkers) > 1:
+            evasions = set()
+        return checkers, evasions, pins
+
+    # Returns the squares a piece may legally move to, given the restrictions of its color's position.
+    # The king may move to any square the enemy doesn't attack, except further along the line of a
+    # sliding piece checking it, and castles only when neither its square nor the one it passes over is attacked.
+    # Other pieces must answer a check and stay on their pin. En passant can also uncover the king
+    # along the pawns' rank, so it is the one move still tried out with self_in_check.
+    def legal_targets(self, piece, checkers, evasions, pins):
+        targets = []
+        if isinstance(piece, King):
+            attacked = self.unsafe_squares(piece, checkers)
+            for column, row in piece.available_moves(self.board):
+                if abs(row - piece.row) == 2:
+                    if checkers or attacked >> (column * NUM_SQUARES + (row + piece.row) // 2) & 1:
+                        continue
+                if not attacked >> (column * NUM_SQUARES + row) & 1:
+                    targets.append((column, row))
+            return targets
+        if evasions is not None and not evasions:
+            return targets
+
+        pin = pins.get(piece)
+        for column, row in piece.available_moves(self.board):
+            if isinstance(piece, Pawn) and row != piece.row and self.board[column][row] is None:
+                if not self.self_in_check(piece, column, row):
+                    targets.append((column, row))
+            elif (evasions is None or (column, row) in evasions) and (pin is None or (column, row) in pin):
+                targets.append((column, row))
+        return targets
+
+    # Returns the mask of squares the king may not move to: those the enemy attacks, and those
+    # further along the line of a sliding piece checking it, which the king itself hides from the attack maps.
+    def unsafe_squares(self, king, checkers):
+        attacked = self.attacked[Color.BLACK if king.color == Color.WHITE else Color.WHITE]
+        for checker in checkers:
+            if type(checker) in SLIDER_RAYS:
+                column = king.column + (king.column > checker.column) - (king.column < checker.column)
+                row = king.row + (king.row > checker.row) - (king.row < checker.row)
+                if 0 <= column < NUM_SQUARES and 0 <= row < NUM_SQUARES:
+                    attacked |= 1 << (column * NUM_SQUARES + row)
+        return attacked
+
+    # Is the given color's king attacked?
+    def in_check(self, color):
+        king = self.white_king if color == Color.WHITE else self.black_king
+        return self.square_attacked(king.column, king.row, Color.BLACK if color == Color.WHITE else Color.WHITE)
+
+    # Does the given color have a piece other than its pawns and king?
+    # Without one, passing could be better than any move (zugzwang), so the search doesn't try null moves.
+    def has_non_pawn_material(self, color):
+        types = self.piece_types[color]
+        return bool(types[Knight] or types[Bishop] or types[Rook] or types[Queen])
+
+    # Plays a move given as a (piece, (column, row)) tuple, as returned by ai.move_list,
+    # or as a (piece, (column, row), piece_class) tuple naming the piece a pawn promotes to.
+    # Handles captures (including en passant), castling and promotion, updates the moved flags,
+    # the passant pawn, the turn, turns_passed, the halfmove clock, the Zobrist key, the evaluation terms
+    # and the attack maps,
+    # and pushes a record onto self.history so unmake_move can restore all of it.
+    # Nothing is drawn, and the move is assumed to be one the piece is allowed to make.
+    def make_move(self, move):
+        piece, (new_y, new_x) = move[0], move[1]
+        old_y = piece.column
+        old_x = piece.row
+        key = self.zobrist_key ^ self.state_key() ^ zobrist.SIDE_KEY
+        scores = self.scores
+        phase_material = self.phase_material
+        self.scores = scores[:]
+
+        # A pawn moving diagonally onto an empty square captures en passant
+        captured = self.board[new_y][new_x]
+        if captured is None and isinstance(piece, Pawn) and new_x != old_x:
+            captured = self.board[old_y][new_x]
+        captured_index = None
+        if captured is not None:
+            self.board[captured.column][captured.row] = None
+            captured_index = self.remove_piece(captured)
+            key ^= zobrist.piece_key(captured, captured.column, captured.row)
+            self.add_scores(captured, captured.column, captured.row, -1)
+
+        # Move the piece
+        self.board[old_y][old_x] = None
+        self.board[new_y][new_x] = piece
+        piece.column = new_y
+        piece.row = new_x
+        key ^= zobrist.piece_key(piece, old_y, old_x) ^ zobrist.piece_key(piece, new_y, new_x)
+        self.add_scores(piece, old_y, old_x, -1)
+        self.add_scores(piece, new_y, new_x, 1)
+
+        # A king moving two squares castles: the rook jumps to the square the king passed over
+        rook = None
+        rook_x = None
+        if isinstance(piece, King) and abs(new_x - old_x) == 2:
+            rook_x = NUM_SQUARES - 1 if new_x > old_x else 0
+            rook = self.board[old_y][rook_x]
+            self.board[old_y][rook_x] = None
+            self.board[old_y][(old_x + new_x) // 2] = rook
+            rook.row = (old_x + new_x) // 2
+            rook.moved = True
+            key ^= zobrist.piece_key(rook, old_y, rook_x) ^ zobrist.piece_key(rook, old_y, rook.row)
+            self.add_scores(rook, old_y, rook_x, -1)
+            self.add_scores(rook, old_y, rook.row, 1)
+
+        # A pawn reaching the far side of the board becomes a queen (or the piece the move names),
+        # taking the pawn's place in its list
+        promoted = None
+        if isinstance(piece, Pawn) and new_y == (0 if piece.color == Color.WHITE else NUM_SQUARES - 1):
+            promotion = move[2] if len(move) > 2 else PROMOTIONS[0]
+            name = piece.color.name.lower() + "_" + promotion.__name__.lower()
+            promoted = promotion(piece.color, new_y, new_x, images[name])
+            promoted.moved = True
+            promoted.index = piece.index
+            self.pieces_of(piece.color)[piece.index] = promoted
+            self.remove_type(piece)
+            promoted_pieces = self.piece_types[piece.color][promotion]
+            promoted.type_index = len(promoted_pieces)
+            promoted_pieces.append(promoted)
+            self.board[new_y][new_x] = promoted
+            key ^= zobrist.piece_key(piece, new_y, new_x) ^ zobrist.piece_key(promoted, new_y, new_x)
+            self.add_scores(piece, new_y, new_x, -1)
+            self.add_scores(promoted, new_y, new_x, 1)
+
+        # Update the attack maps of the pieces that moved, left the board or appeared,
+        # and of any sliding piece whose lines ran into a square that changed
+        changed = 1 << (old_y * NUM_SQUARES + old_x) | 1 << (new_y * NUM_SQUARES + new_x)
+        attack_changes = []
+        if captured is not None:
+            changed |= 1 << (captured.column * NUM_SQUARES + captured.row)
+            attack_changes.append((captured, captured.attacks))
+            self.set_attacks(captured, 0)
+        if promoted is not None:
+            attack_changes.append((piece, piece.attacks))
+            self.set_attacks(piece, 0)
+            attack_changes.append((promoted, 0))
+            self.set_attacks(promoted, self.attack_mask(promoted))
+        else:
+            attack_changes.append((piece, piece.attacks))
+            self.set_attacks(piece, self.attack_mask(piece))
+        if rook is not None:
+            changed |= 1 << (old_y * NUM_SQUARES + rook_x) | 1 << (old_y * NUM_SQUARES + rook.row)
+            attack_changes.append((rook, rook.attacks))
+            self.set_attacks(rook, self.attack_mask(rook))
+        for types in self.piece_types.values():
+            for piece_class in SLIDER_RAYS:
+                for other in types[piece_class]:
+                    if other.attacks & changed and other is not piece and other is not rook and other is not promoted:
+                        attack_changes.append((other, other.attacks))
+                        self.set_attacks(other, self.attack_mask(other))
+
+        self.history.append((piece, old_y, old_x, piece.moved, captured, captured_index,
+                             rook, rook_x, promoted, self.passant_pawn, self.zobrist_key, scores, phase_material,
+                             self.halfmove_clock, attack_changes))
+        piece.moved = True
+        self.set_en_passant(piece, old_y)
+        self.turn = Color.BLACK if self.turn == Color.WHITE else Color.WHITE
+        self.turns_passed += 1
+        if captured is not None or isinstance(piece, Pawn):
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        self.zobrist_key = key ^ self.state_key()
+
+    # Takes back the last move made with make_move, restoring the board, piece lists,
+    # flags, passant pawn, turn, turns_passed, halfmove clock, Zobrist key, evaluation terms
+    # and attack maps from the history record.
+    def unmake_move(self):
+        piece, old_y, old_x, moved, captured, captured_index, rook, rook_x, promoted, passant_pawn, key, \
+            self.scores, self.phase_material, self.halfmove_clock, attack_changes = self.history.pop()
+        for changed_piece, attacks in reversed(attack_changes):
+            self.set_attacks(changed_piece, attacks)
+        new_y = piece.column
+        new_x = piece.row
+        if promoted is not None:
+            self.pieces_of(piece.color)[piece.index] = piece
+            self.piece_types[piece.color][type(promoted)].pop()
+            self.restore_type(piece)
+        if rook is not None:
+            self.board[old_y][rook.row] = None
+            self.board[old_y][rook_x] = rook
+            rook.row = rook_x
+            rook.moved = False
+        self.board[new_y][new_x] = None
+        self.board[old_y][old_x] = piece
+        piece.column = old_y
+        piece.row = old_x
+        piece.moved = moved
+        if captured is not None:
+            self.board[captured.column][captured.row] = captured
+            self.restore_piece(captured, captured_index)
+        if self.passant_pawn is not None:
+            self.passant_pawn.receive_passant(False)
+        self.passant_pawn = passant_pawn
+        if passant_pawn is not None:
+            passant_pawn.receive_passant(True)
+        self.turn = Color.BLACK if self.turn == Color.WHITE else Color.WHITE
+        self.turns_passed -= 1
+        self.zobrist_key = key
+
+    # Passes the turn to the other side without moving anything, for the search's null move pruning.
+    # The passant pawn can no longer be captured. The history record starts with None,
+    # so that it can be told apart from the records of make_move.
+    def make_null_move(self):
+        self.history.append((None, self.passant_pawn, self.zobrist_key))
+        key = self.zobrist_key ^ self.state_key() ^ zobrist.SIDE_KEY
+        if self.passant_pawn is not None:
+            self.passant_pawn.receive_passant(False)
+            self.passant_pawn = None
+        self.turn = Color.BLACK if self.turn == Color.WHITE else Color.WHITE
+        self.zobrist_key = key ^ self.state_key()
+
+    # Takes back the last call to make_null_move.
+    def unmake_null_move(self):
+        null, self.passant_pawn, self.zobrist_key = self.history.pop()
+        if self.passant_pawn is not None:
+            self.passant_pawn.receive_passant(True)
+        self.turn = Color.BLACK if self.turn == Color.WHITE else Color.WHITE
+
+    # Check if the move will place yourself in check...
+    # If true, do not allow for the move....
+    # First, move the piece to the desired location.
+    # Then, cycle through enemy pieces and see if they can attack the king.
+    # Then move the piece back, as well as any piece that was at that location.
+    # If the offending piece would be captured, don't check for it.
+    # This is called before we check can_move.
+    # Also factor in special moves: a pawn capturing en passant also lifts the pawn it captures.
+    def self_in_check(self, piece, new_y, new_x):
+        current_y = piece.column
+        current_x = piece.row
+        temp = self.board[new_y][new_x]
+        passant = None
+        if temp is None and isinstance(piece, Pawn) and new_x != current_x:
+            passant = self.board[current_y][new_x]
+            self.board[current_y][new_x] = None
+        self.board[current_y][current_x] = None
+        self.board[new_y][new_x] = piece
+        check = False
+        if piece.color == Color.BLACK:
+            pieces = self.white_pieces
+            king = self.black_king
+        else:
+            pieces = self.black_pieces
+            king = self.white_king
+        if piece is king:
+            king.column = new_y
+            king.row = new_x
+        for p in pieces:
+            if p is not passant and (p.column != new_y or p.row != new_x):
+                if p.place_check(self.board, king.column, king.row):
+                    check = True
+                    break
+        if piece is king:
+            king.column = current_y
+            king.row = current_x
+        self.board[current_y][current_x] = piece
+        self.board[new_y][new_x] = temp
+        if passant is not None:
+            self.board[current_y][new_x] = passant
+        return check
+
+    # Check if moving this piece will place your opponent in check...
+    # Call AFTER moving your piece.
+    # See if the squares your pieces attack include the opponent's king, using the attack maps.
+    def opponent_in_check(self, piece, board):
+        return self.in_check(Color.WHITE if piece.color == Color.BLACK else Color.BLACK)
+
+    # Check ONLY after check: Pass in the piece placing the king in check.
+    # The opponent is checkmated if none of their moves gets the king out of check.
+    def checkmate(self, piece):
+        if self.legal_moves(Color.WHITE if piece.color == Color.BLACK else Color.BLACK):
+            return False
+        self.in_checkmate = True
+        return True
+
+    # Check to see if the piece is a pawn that just moved up 2 spaces from the front line.
+    # Check to see if neighbors exist and if they're pawns of a different color.
+    # If so, it becomes the passant pawn, which may be captured en passant next turn.
+    # Because chess rules allow a pawn to en passant only during the turn after the
+    # opponent's pawn moves, any previous passant pawn loses that status.
+    def set_en_passant(self, piece, old_column):
+        if self.passant_pawn is not None:
+            self.passant_pawn.receive_passant(False)
+            self.passant_pawn = None
+        if isinstance(piece, Pawn) and abs(piece.column - old_column) == 2:
+            for row in (piece.row - 1, piece.row + 1):
+                if 0 <= row < NUM_SQUARES and isinstance(self.board[piece.column][row], Pawn) and \
+                        self.board[piece.column][row].color != piece.color:
+                    piece.receive_passant(True)
+                    self.passant_pawn = piece
+                    return
+
+    # Returns a list of pieces that the AI is allowed to move.
+    def get_ai_pieces(self):
+        return self.black_pieces
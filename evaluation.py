@@ -0,0 +1,92 @@
+from pieces.bishop import Bishop
+from pieces.king import King
+from pieces.knight import Knight
+from pieces.pawn import Pawn
+from pieces.piece import Color
+from pieces.queen import Queen
+from pieces.rook import Rook
+
+NUM_SQUARES = 8
+PIECE_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)
+
+# Phases of the game, each with its own piece-square tables.
+OPENING, MIDDLE_GAME, ENDGAME = range(3)
+NUM_PHASES = 3
+
+# Scores are kept in hundredths of a pawn so that they add and subtract exactly.
+SCALE = 100
+
+# Piece values, matching Piece.val for each piece class.
+PIECE_VALUES = {Pawn: 1, Knight: 3, Bishop: 3, Rook: 5, Queen: 9, King: 10}
+
+# How much each piece counts towards the material that decides the phase of the game.
+# Pawns and kings don't count; both sides start with 31 each.
+PHASE_VALUES = {Pawn: 0, Knight: 3, Bishop: 3, Rook: 5, Queen: 9, King: 0}
+
+# The game is in the opening until more than a minor piece has been traded off,
+# and in the endgame once no more than a queen, a rook and a minor piece are left on each side.
+OPENING_MATERIAL = 56
+ENDGAME_MATERIAL = 34
+
+
+# Returns the phase of the game for the total phase material of both sides.
+def phase(material):
+    if material > OPENING_MATERIAL:
+        return OPENING
+    elif material > ENDGAME_MATERIAL:
+        return MIDDLE_GAME
+    return ENDGAME
+
+
+# Opening principles, in hundredths of a pawn, for a black piece.
+# column counts from black's side of the board.
+# 1.) Knights and bishops come off the back rank
+# 2.) Pieces leave the rank they start on
+# 3.) Pieces go towards the center
+# 4.) Pieces attack into the opponent's half
+def opening_bonus(piece_class, column, row):
+    bonus = 0
+    if piece_class in (Bishop, Knight) and column != 0:
+        bonus += 1
+    if column != (1 if piece_class is Pawn else 0):
+        bonus += 1
+    if 1 < row < 6:
+        bonus += 1
+    if column > 1:
+        bonus += 1
+    return bonus
+
+
+# Middle game and endgame bonuses, in hundredths of a pawn: pawns are worth more
+# as they become candidates for promotion.
+MIDDLE_GAME_PAWN_BONUS = 5
+ENDGAME_PAWN_BONUS = 10
+
+
+# Returns the (opening, middle game, endgame) scores of a black piece on a square,
+# including its value.
+def black_scores(piece_class, column, row):
+    value = PIECE_VALUES[piece_class] * SCALE
+    if piece_class is Pawn:
+        return value + opening_bonus(piece_class, column, row), \
+            value + MIDDLE_GAME_PAWN_BONUS, value + ENDGAME_PAWN_BONUS
+    return value + opening_bonus(piece_class, column, row), value, value
+
+
+# Piece-square tables indexed by color, piece class and square, giving the (opening, middle game,
+# endgame) scores of a piece on that square, positive for black and negative for white.
+# Squares are numbered column by column: board[column][row] is square column * 8 + row.
+# White's tables are black's, mirrored from one side of the board to the other.
+SQUARE_SCORES = {
+    Color.BLACK: {piece_class: [black_scores(piece_class, sq // NUM_SQUARES, sq % NUM_SQUARES)
+                                for sq in range(NUM_SQUARES * NUM_SQUARES)]
+                  for piece_class in PIECE_CLASSES},
+    Color.WHITE: {piece_class: [tuple(-score for score in
+                                      black_scores(piece_class, NUM_SQUARES - 1 - sq // NUM_SQUARES, sq % NUM_SQUARES))
+                                for sq in range(NUM_SQUARES * NUM_SQUARES)]
+                  for piece_class in PIECE_CLASSES}}
+
+
+# Returns the (opening, middle game, endgame) scores of a piece standing on a particular square.
+def piece_scores(piece, column, row):
+    return SQUARE_SCORES[piece.color][type(piece)][column * NUM_SQUARES + row]
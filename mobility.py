@@ -0,0 +1,63 @@
+from collections import OrderedDict
+
+from pieces.piece import Color
+
+DEFAULT_CAPACITY = 65536
+
+
+# Caches the mobility of each side in a position: the number of moves its pieces can make,
+# keyed by Zobrist key so that chess.Chess and bitboard.Bitboard positions share entries.
+# Both sides are computed together, in one pass over the pieces, the first time a position is seen.
+# Once capacity positions are stored, the least recently used one is evicted.
+class MobilityCache:
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    # Returns a dict mapping each color to its mobility in the position.
+    # Game may be a chess.Chess or a bitboard.Bitboard: both provide mobility and zobrist_key.
+    def lookup(self, game):
+        self.lookups += 1
+        key = game.zobrist_key
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        entry = {Color.WHITE: game.mobility(Color.WHITE), Color.BLACK: game.mobility(Color.BLACK)}
+        self.entries[key] = entry
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    # Returns the number of moves a side's pieces can make.
+    def mobility(self, game, color):
+        return self.lookup(game)[color]
+
+    # Empties the cache and resets its counters.
+    def clear(self):
+        self.entries.clear()
+        self.reset_counters()
+
+    # Resets the hit/miss counters, leaving the cached positions in place.
+    def reset_counters(self):
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    # Fraction of lookups that found the position already cached.
+    def hit_rate(self):
+        if self.lookups == 0:
+            return 0.0
+        return self.hits / self.lookups
+
+    # Returns a one line summary of the cache's usage.
+    def report(self):
+        return "mobility: {} lookups, {} hits ({:.1%}), {} misses, {} evictions, {}/{} positions cached".format(
+            self.lookups, self.hits, self.hit_rate(), self.lookups - self.hits, self.evictions,
+            len(self.entries), self.capacity)
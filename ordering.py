@@ -0,0 +1,151 @@
+import bitboard
+from bitboard import Bitboard, NUM_SQUARES, BOARD_SIZE
+from pieces.pawn import Pawn
+from pieces.piece import Color
+
+# Moves are sorted by a score: the hash move first, then captures by most valuable victim /
+# least valuable attacker, then killer moves, then every other move by its history score.
+HASH_MOVE_SCORE = 1 << 40
+CAPTURE_SCORE = 1 << 36
+KILLER_SCORE = 1 << 32
+
+KILLERS_PER_PLY = 2
+MAX_PLY = 128
+
+
+# Returns the (victim value, attacker value) of a capture, or None if the move is not a capture.
+# A pawn moving diagonally onto an empty square captures a pawn en passant.
+def capture_values(game, move):
+    if isinstance(game, Bitboard):
+        from_sq, to_sq = move
+        attacker = game.mailbox[from_sq][1]
+        victim = game.mailbox[to_sq]
+        if victim is not None:
+            return bitboard.VALUES[victim[1]], bitboard.VALUES[attacker]
+        elif attacker == bitboard.PAWN and (to_sq - from_sq) % NUM_SQUARES != 0:
+            return 1, 1
+        return None
+    piece, (column, row) = move
+    victim = game.board[column][row]
+    if victim is not None:
+        return victim.val, piece.val
+    elif isinstance(piece, Pawn) and row != piece.row:
+        return 1, 1
+    return None
+
+
+# Static exchange evaluation: the material a capture wins, or loses if negative, once both sides
+# have finished recapturing on its square, each always with its least valuable attacker and each free
+# to stop when recapturing would lose more. En passant captures are scored as a plain pawn capture.
+def static_exchange(game, move):
+    victim, attacker = capture_values(game, move)
+    from_sq, to_sq = bitboard.pack_move(game, move)
+    side = Color.BLACK if game.turn == Color.WHITE else Color.WHITE
+    # The capturing piece and its victim have both left their squares
+    removed = 1 << from_sq | 1 << to_sq
+    gains = [victim]
+    while True:
+        # What the side to recapture gains if it takes the last piece to capture, before any reply
+        gains.append(attacker - gains[-1])
+        found = game.least_valuable_attacker(to_sq, side, removed)
+        if found is None:
+            break
+        sq, attacker = found
+        removed |= 1 << sq
+        side = Color.BLACK if side == Color.WHITE else Color.WHITE
+    # The last entry is a capture nobody is left to make. Working backwards, each side
+    # either recaptures or stops, whichever is better for it.
+    for i in range(len(gains) - 2, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
+
+
+# Is the move neither a capture nor a promotion?
+# Only quiet moves are reduced or pruned by the search, since the others change the material.
+def is_quiet(game, move):
+    if capture_values(game, move) is not None:
+        return False
+    if isinstance(game, Bitboard):
+        from_sq, to_sq = move
+        column = to_sq // NUM_SQUARES
+        return game.mailbox[from_sq][1] != bitboard.PAWN or 0 < column < NUM_SQUARES - 1
+    piece, (column, row) = move[0], move[1]
+    return not isinstance(piece, Pawn) or 0 < column < NUM_SQUARES - 1
+
+
+# Keeps the killer moves and history scores used to order moves in the search,
+# along with statistics on how well the ordering works.
+# A cutoff is a move that proves its node falls outside the alpha-beta window;
+# a good ordering finds that move first.
+class MoveOrdering:
+
+    def __init__(self):
+        self.killers = [[None] * KILLERS_PER_PLY for ply in range(MAX_PLY)]
+        self.history = [0] * (2 * BOARD_SIZE * BOARD_SIZE)
+        self.root_ply = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    # Called at the start of each search: forgets the killer moves, halves the
+    # history scores so that recent searches count for more, and resets the statistics.
+    def new_search(self, game):
+        self.root_ply = len(game.history)
+        self.killers = [[None] * KILLERS_PER_PLY for ply in range(MAX_PLY)]
+        self.history = [score // 2 for score in self.history]
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    # Number of moves made since the root of the search.
+    def ply(self, game):
+        return min(len(game.history) - self.root_ply, MAX_PLY - 1)
+
+    # Index of a packed move in the history table.
+    @staticmethod
+    def history_index(color, packed):
+        return ((color == Color.BLACK) * BOARD_SIZE + packed[0]) * BOARD_SIZE + packed[1]
+
+    # Returns the moves of color sorted so that the most promising are searched first.
+    def order(self, game, moves, hash_move, color):
+        killers = self.killers[self.ply(game)]
+        scored = []
+        for move in moves:
+            if move == hash_move:
+                score = HASH_MOVE_SCORE
+            else:
+                values = capture_values(game, move)
+                packed = bitboard.pack_move(game, move)
+                if values is not None:
+                    score = CAPTURE_SCORE + values[0] * 16 - values[1]
+                elif packed in killers:
+                    score = KILLER_SCORE - killers.index(packed)
+                else:
+                    score = self.history[self.history_index(color, packed)]
+            scored.append((score, move))
+        scored.sort(key=lambda entry: -entry[0])
+        return [entry[1] for entry in scored]
+
+    # Records a move that caused a cutoff after index other moves were searched at this node.
+    # Quiet moves become killers for this ply and gain history in proportion to the depth searched.
+    def record_cutoff(self, game, move, index, depth, color):
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if capture_values(game, move) is not None:
+            return
+        packed = bitboard.pack_move(game, move)
+        killers = self.killers[self.ply(game)]
+        if packed not in killers:
+            killers.pop()
+            killers.insert(0, packed)
+        self.history[self.history_index(color, packed)] += depth * depth
+
+    # Fraction of cutoffs caused by the first move searched.
+    def first_move_cutoff_rate(self):
+        if self.cutoffs == 0:
+            return 0.0
+        return self.first_move_cutoffs / self.cutoffs
+
+    # Returns a one line summary of the ordering statistics.
+    def report(self):
+        return "ordering: {} cutoffs, {} on the first move ({:.1%})".format(
+            self.cutoffs, self.first_move_cutoffs, self.first_move_cutoff_rate())
@@ -0,0 +1,182 @@
+import multiprocessing
+import sys
+import time
+
+import ai
+import engine
+from pieces.piece import Color
+
+# Positions used by benchmark, as the moves leading to them from the starting position.
+# Each move is a ((column, row), (column, row)) pair of squares. Black is to move in all of them.
+POSITIONS = [
+    [((6, 4), (4, 4))],
+    [((6, 4), (4, 4)), ((1, 4), (3, 4)), ((7, 6), (5, 5))],
+    [((6, 3), (4, 3)), ((1, 3), (3, 3)), ((6, 2), (4, 2))],
+    [((6, 4), (4, 4)), ((1, 2), (3, 2)), ((7, 6), (5, 5)), ((1, 3), (2, 3)), ((6, 3), (4, 3))],
+]
+
+# Worker processes searching root moves, created by get_pool and reused between searches
+# so that they keep their transposition tables.
+pool = None
+pool_processes = None
+
+# The switches in ai for the selective parts of the search, which workers copy from the
+# parent process when the pool is created.
+SELECTIVE_SWITCHES = ["NULL_MOVE_PRUNING", "LATE_MOVE_REDUCTIONS", "FUTILITY_PRUNING"]
+
+
+# Returns the current value of each switch in SELECTIVE_SWITCHES.
+def selective_switches():
+    return {name: getattr(ai, name) for name in SELECTIVE_SWITCHES}
+
+
+# Sets the switches in ai from a dict like the one selective_switches returns.
+# Also runs in each new worker, so that it searches the same way as the parent.
+def set_switches(switches):
+    for name, value in switches.items():
+        setattr(ai, name, value)
+
+
+# Returns a pool of the given number of worker processes (one per core if None),
+# replacing the current one if it has a different size.
+def get_pool(processes=None):
+    global pool, pool_processes
+    processes = processes or multiprocessing.cpu_count()
+    if pool is None or pool_processes != processes:
+        close_pool()
+        pool = multiprocessing.Pool(processes, set_switches, (selective_switches(),))
+        pool_processes = processes
+    return pool
+
+
+# Shuts down the worker processes.
+def close_pool():
+    global pool, pool_processes
+    if pool is not None:
+        pool.close()
+        pool.join()
+        pool = None
+        pool_processes = None
+
+
+# Converts a line of (piece, (column, row)) moves played from the game's position into
+# ((column, row), (column, row)) pairs of squares, which can be sent between processes.
+def compact_line(game, line):
+    compact = []
+    for piece, target in line:
+        compact.append(((piece.column, piece.row), target))
+        game.make_move((piece, target))
+    for move in line:
+        game.unmake_move()
+    return compact
+
+
+# Turns the result of compact_line back into moves of the game's pieces.
+def expand_line(game, compact):
+    line = []
+    for (column, row), target in compact:
+        move = (game.board[column][row], target)
+        line.append(move)
+        game.make_move(move)
+    for move in line:
+        game.unmake_move()
+    return line
+
+
+# Runs in a worker: searches one root move of a snapshot turns moves deep, looking only for
+# scores above alpha, from the point of view of the side to move at the root.
+# Returns the score, the principal variation starting with the move in compact form,
+# and the number of nodes searched by the main and quiescence searches.
+def search_root_move(task):
+    snapshot, move, turns, alpha = task
+    game = engine.Chess.from_snapshot(snapshot)
+    root = (game.board[move[0][0]][move[0][1]], move[1])
+    ai.nodes_searched = 0
+    ai.quiescence_nodes = 0
+    ai.transposition_table.new_search()
+    ai.move_ordering.new_search(game)
+    game.make_move(root)
+    pv = []
+    score = -ai.negamax(game, turns - 1, -ai.INFINITY, -alpha, pv)
+    game.unmake_move()
+    return score, compact_line(game, [root] + pv), ai.nodes_searched, ai.quiescence_nodes
+
+
+# Searches the game turns moves deep, spreading its root moves across a pool of processes.
+# The first move, the most likely best, is searched alone to find a score the others must beat,
+# then the rest are searched in parallel. Positions are sent to the workers as snapshots.
+# Returns [score, piece, move, principal variation] like ai.minimax_helper, and sets
+# ai.nodes_searched and ai.quiescence_nodes to the totals over all workers.
+def search(game, turns, processes=None):
+    workers = get_pool(processes)
+    snapshot = game.snapshot()
+    moves = ai.move_ordering.order(game, game.legal_moves(game.turn), None, game.turn)
+    if not moves:
+        return ai.minimax_helper(game, turns, game.turn == Color.BLACK, -ai.INFINITY, ai.INFINITY)
+    tasks = [(snapshot, ((piece.column, piece.row), target), turns) for piece, target in moves]
+    best = workers.apply(search_root_move, (tasks[0] + (-ai.INFINITY,),))
+    results = workers.map(search_root_move, [task + (best[0],) for task in tasks[1:]], chunksize=1)
+    nodes = best[2]
+    quiescence_nodes = best[3]
+    for result in results:
+        nodes += result[2]
+        quiescence_nodes += result[3]
+        if result[0] > best[0]:
+            best = result
+    ai.nodes_searched = nodes
+    ai.quiescence_nodes = quiescence_nodes
+    return ai.search_result(game, best[0], expand_line(game, best[1]))
+
+
+# Searches every position in POSITIONS depth moves deep, first on one core with
+# ai.minimax_helper and then with search for each number of processes, printing the time
+# taken and the speedup over the single core search.
+# The selective parts of the search (see ai.negamax) prune differently inside different windows,
+# so they are switched off while measuring, for every search to do the same work as the serial one.
+def benchmark(depth=4, process_counts=None):
+    process_counts = process_counts or sorted({1, 2, 4, multiprocessing.cpu_count()})
+    games = []
+    for moves in POSITIONS:
+        game = engine.Chess()
+        for (column, row), target in moves:
+            game.make_move((game.board[column][row], target))
+        game.history = []
+        games.append(game)
+
+    switches = selective_switches()
+    set_switches({name: False for name in SELECTIVE_SWITCHES})
+    try:
+        start = time.time()
+        nodes = 0
+        scores = []
+        for game in games:
+            ai.transposition_table.clear()
+            ai.move_ordering.new_search(game)
+            ai.nodes_searched = 0
+            ai.quiescence_nodes = 0
+            scores.append(ai.minimax_helper(game, depth, True, -ai.INFINITY, ai.INFINITY)[0])
+            nodes += ai.nodes_searched + ai.quiescence_nodes
+        serial = time.time() - start
+        print("depth {}, {} positions, {} cores".format(depth, len(games), multiprocessing.cpu_count()))
+        print("serial       {:7.2f}s  {:8d} nodes".format(serial, nodes))
+
+        for processes in process_counts:
+            close_pool()
+            get_pool(processes)
+            start = time.time()
+            nodes = 0
+            agree = True
+            for game, score in zip(games, scores):
+                result = search(game, depth, processes)
+                nodes += ai.nodes_searched + ai.quiescence_nodes
+                agree = agree and abs(result[0] - score) < 1e-9
+            elapsed = time.time() - start
+            print("{:2d} processes {:7.2f}s  {:8d} nodes  {:5.2f}x speedup{}".format(
+                processes, elapsed, nodes, serial / elapsed, "" if agree else "  (scores differ)"))
+    finally:
+        set_switches(switches)
+        close_pool()
+
+
+if __name__ == '__main__':
+    benchmark(*[int(arg) for arg in sys.argv[1:2]])
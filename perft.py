@@ -0,0 +1,98 @@
+import sys
+import time
+
+import engine
+import uci
+
+# Reference positions and their perft counts, from depth 1 upwards.
+# Together they cover castling, en passant (including discovered checks along the rank),
+# promotions and underpromotions, checks and pins.
+POSITIONS = [
+    ("start", engine.START_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+# run_suite stops going deeper in a position once the expected count passes this many nodes.
+MAX_NODES = 100000
+
+
+# Counts the positions reached after depth moves, using the game's own move generation
+# and make_move/unmake_move. The last ply is counted without being played.
+def perft(game, depth):
+    moves = game.legal_moves(game.turn, True)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        game.make_move(move)
+        nodes += perft(game, depth - 1)
+        game.unmake_move()
+    return nodes
+
+
+# Returns the perft count below each root move, as a {UCI move name: nodes} dictionary.
+def divide(game, depth):
+    counts = {}
+    for move in game.legal_moves(game.turn, True):
+        name = uci.move_name(move)
+        game.make_move(move)
+        counts[name] = perft(game, depth - 1)
+        game.unmake_move()
+    return counts
+
+
+# Prints the divide of a FEN position with the total and the nodes per second.
+def run_divide(fen, depth):
+    game = engine.Chess.from_fen(fen)
+    start = time.time()
+    counts = divide(game, depth)
+    elapsed = time.time() - start
+    for name in sorted(counts):
+        print("{}: {}".format(name, counts[name]))
+    nodes = sum(counts.values())
+    print("nodes {}  {:.2f}s  {:.0f} nps".format(nodes, elapsed, nodes / max(elapsed, 1e-9)))
+    return nodes
+
+
+# Checks every reference position, as deep as max_nodes allows, printing each count with
+# the nodes per second. Returns whether all of them matched.
+def run_suite(max_nodes=MAX_NODES):
+    passed = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, expected in POSITIONS:
+        game = engine.Chess.from_fen(fen)
+        for depth, count in enumerate(expected, 1):
+            if depth > 1 and count > max_nodes:
+                break
+            start = time.time()
+            nodes = perft(game, depth)
+            elapsed = time.time() - start
+            total_nodes += nodes
+            total_time += elapsed
+            passed = passed and nodes == count
+            print("{:11s} depth {}  {:8d} nodes  {:6.2f}s  {:7.0f} nps  {}".format(
+                name, depth, nodes, elapsed, nodes / max(elapsed, 1e-9),
+                "ok" if nodes == count else "expected {}".format(count)))
+    print("{} nodes in {:.2f}s, {:.0f} nps".format(total_nodes, total_time, total_nodes / max(total_time, 1e-9)))
+    return passed
+
+
+# python perft.py                 runs the reference positions
+# python perft.py MAX_NODES       runs them up to a different node count
+# python perft.py DEPTH FEN       divides a position
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        run_divide(" ".join(sys.argv[2:]), int(sys.argv[1]))
+    else:
+        sys.exit(0 if run_suite(*[int(arg) for arg in sys.argv[1:2]]) else 1)
@@ -4,6 +4,7 @@ from pieces.queen import Queen
 # Represents a bishop piece.
 # Inherits from Queen to reuse the diagonal movement method.
 class Bishop(Queen):
+    __slots__ = ()
 
     # Inherited constructor
     # Update the piece value
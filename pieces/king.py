@@ -1,8 +1,13 @@
-from pieces.piece import Piece
+from pieces.piece import Piece, step_table
+from pieces.rook import Rook
+
+# Squares next to each square, which a king on it may step to, as KING_MOVES[column][row].
+KING_MOVES = step_table(((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)))
 
 
 # Represents a king piece.
 class King(Piece):
+    __slots__ = ()
 
     # Inherited constructor
     # Update the piece value
@@ -14,20 +19,34 @@ class King(Piece):
     # Allows movement to any square that is next to the king's current square,
     # as long as the new square does not hold a friendly piece.
     # Check is handled in chess.Chess
+    # The king may also move two squares towards a rook to castle.
     def can_move(self, board, column, row):
-        if self.column - 1 <= column <= self.column + 1 and 0 <= column < len(board) and \
-                self.row - 1 <= row <= self.row + 1 and 0 <= row < len(board):
-            if board[column][row] is not None and board[column][row].color == self.color:
+        if (column, row) in KING_MOVES[self.column][self.row]:
+            return board[column][row] is None or board[column][row].color != self.color
+        return self.can_castle(board, column, row)
+
+    # Checks if the king can castle by moving two squares along its column.
+    # Neither the king nor the rook in the corner it moves towards may have moved,
+    # and every square between them must be empty.
+    # Castling out of or through check is handled in chess.Chess
+    def can_castle(self, board, column, row):
+        if self.moved or column != self.column or abs(row - self.row) != 2 or not 0 <= row < len(board):
+            return False
+        rook_row = len(board) - 1 if row > self.row else 0
+        rook = board[column][rook_row]
+        if not isinstance(rook, Rook) or rook.color != self.color or rook.moved:
+            return False
+        for i in range(min(self.row, rook_row) + 1, max(self.row, rook_row)):
+            if board[column][i] is not None:
                 return False
-            return True
-        return False
+        return True
 
     # Returns a list of available moves that a piece may make, given a particular board.
-    # Cycle through the 3x3 square around the king.
+    # Take the squares around the king that don't hold a friendly piece, then check both castling squares.
     def available_moves(self, board):
-        moves = []
-        for i in range(self.column - 1, self.column + 2):
-            for j in range(self.row - 1, self.row + 2):
-                if self.can_move(board, i, j):
-                    moves.append((i, j))
+        moves = [(column, row) for column, row in KING_MOVES[self.column][self.row]
+                 if board[column][row] is None or board[column][row].color != self.color]
+        for j in (self.row - 2, self.row + 2):
+            if self.can_castle(board, self.column, j):
+                moves.append((self.column, j))
         return moves
\ No newline at end of file
@@ -1,7 +1,11 @@
-from pieces.piece import Piece
+from pieces.piece import Piece, step_table
+
+# Squares a knight on each square jumps to, as KNIGHT_MOVES[column][row].
+KNIGHT_MOVES = step_table(((2, 1), (2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2), (-2, 1), (-2, -1)))
 
 
 class Knight(Piece):
+    __slots__ = ()
 
     # Inherited constructor
     # Update the piece value
@@ -13,29 +17,12 @@ class Knight(Piece):
     # Is there a friendly piece in that square?
     # Otherwise, it can move.
     def can_move(self, board, column, row):
-        if column >= len(board) or row >= len(board) or column < 0 or row < 0 or \
-                (board[column][row] is not None and board[column][row].color == self.color):
+        if (column, row) not in KNIGHT_MOVES[self.column][self.row]:
             return False
-        elif (self.column + 2 == column and self.row + 1 == row) or \
-                (self.column + 2 == column and self.row - 1 == row) or \
-                (self.column - 2 == column and self.row + 1 == row) or \
-                (self.column - 2 == column and self.row - 1 == row) or \
-                (self.column + 1 == column and self.row + 2 == row) or \
-                (self.column + 1 == column and self.row - 2 == row) or \
-                (self.column - 1 == column and self.row + 2 == row) or \
-                (self.column - 1 == column and self.row - 2 == row):
-            return True
-        return False
+        return board[column][row] is None or board[column][row].color != self.color
 
-    # Returns a list of available moves that a piece may make, given a particular board
+    # Returns a list of available moves that a piece may make, given a particular board:
+    # the squares in its move table that don't hold a friendly piece
     def available_moves(self, board):
-        moves = []
-        i = 2
-        while i > -3:
-            j = 2
-            while j > -3:
-                if self.can_move(board, self.column + i, self.row + j):
-                    moves.append((self.column + i, self.row + j))
-                j -= 1
-            i -= 1
-        return moves
\ No newline at end of file
+        return [(column, row) for column, row in KNIGHT_MOVES[self.column][self.row]
+                if board[column][row] is None or board[column][row].color != self.color]
\ No newline at end of file
@@ -1,7 +1,31 @@
-from pieces.piece import Piece, Color
+from pieces.piece import Piece, Color, NUM_SQUARES
+
+
+# Returns the move tables of a color's pawns, which move direction columns at a time
+# (1 for black, -1 for white) and may move two squares from the start column:
+# the squares a pawn on each square pushes to, nearest first, and the squares it captures on.
+def pawn_tables(direction, start):
+    pushes = [[() for row in range(NUM_SQUARES)] for column in range(NUM_SQUARES)]
+    captures = [[() for row in range(NUM_SQUARES)] for column in range(NUM_SQUARES)]
+    for column in range(NUM_SQUARES):
+        ahead = column + direction
+        if not 0 <= ahead < NUM_SQUARES:
+            continue
+        for row in range(NUM_SQUARES):
+            pushes[column][row] = ((ahead, row), (ahead + direction, row)) if column == start else ((ahead, row),)
+            captures[column][row] = tuple((ahead, j) for j in (row + 1, row - 1) if 0 <= j < NUM_SQUARES)
+    return pushes, captures
+
+
+# Pawn move tables for each color, as PAWN_PUSHES[color][column][row] and PAWN_CAPTURES[color][column][row].
+BLACK_TABLES = pawn_tables(1, 1)
+WHITE_TABLES = pawn_tables(-1, NUM_SQUARES - 2)
+PAWN_PUSHES = {Color.BLACK: BLACK_TABLES[0], Color.WHITE: WHITE_TABLES[0]}
+PAWN_CAPTURES = {Color.BLACK: BLACK_TABLES[1], Color.WHITE: WHITE_TABLES[1]}
 
 
 class Pawn(Piece):
+    __slots__ = ("can_be_passant",)
 
     # Adds in an additional boolean to keep track of whether or not the
     # opponent's pawns may capture this one via en passant.
@@ -116,23 +140,19 @@ class Pawn(Piece):
         self.can_be_passant = var
 
     # Returns a list of available moves that a piece may make, given a particular board
-    # Check a 2 squares in front of the pawn and squares immediately diagonally to the
-    # right and left.
+    # Push forwards through the empty squares in the pawn's push table, then capture on the squares
+    # in its capture table that hold an enemy piece, or that it may reach en passant.
     def available_moves(self, board):
-        if self.color == Color.BLACK:
-            return self.available_moves_helper(board, 1)
-        return self.available_moves_helper(board, -1)
-
-    # Pass -1 as direction for white pieces, 1 for black pieces
-    def available_moves_helper(self, board, direction):
         moves = []
-        column = self.column + direction
-        if self.can_move(board, column, self.row):
-            moves.append((column, self.row))
-        if self.can_move(board, column + direction, self.row):
-            moves.append((column + direction, self.row))
-        if self.can_move(board, column, self.row + 1):
-            moves.append((column, self.row + 1))
-        if self.can_move(board, column, self.row - 1):
-            moves.append((column, self.row - 1))
+        for column, row in PAWN_PUSHES[self.color][self.column][self.row]:
+            if board[column][row] is not None:
+                break
+            moves.append((column, row))
+        for column, row in PAWN_CAPTURES[self.color][self.column][self.row]:
+            target = board[column][row]
+            if target is not None:
+                if target.color != self.color:
+                    moves.append((column, row))
+            elif self.can_en_passant(board, column, row):
+                moves.append((column, row))
         return moves
@@ -1,5 +1,6 @@
 import enum
-import pygame
+
+NUM_SQUARES = 8
 
 
 # Each piece is assigned a color: white or black.
@@ -9,34 +10,41 @@ class Color(enum.Enum):
     WHITE = 2
 
 
+# Returns a table of the squares reached from each square by one of the (column, row) steps:
+# table[column][row] is a tuple of the (column, row) squares that are on the board.
+def step_table(steps):
+    return [[tuple((column + i, row + j) for i, j in steps
+                   if 0 <= column + i < NUM_SQUARES and 0 <= row + j < NUM_SQUARES)
+             for row in range(NUM_SQUARES)] for column in range(NUM_SQUARES)]
+
+
 # Generic class to represent a piece
-# Every piece class must inherit from this class
+# Every piece class must inherit from this class, and declare __slots__ for any attributes it adds,
+# so that pieces are stored without a __dict__ each.
 class Piece:
+    __slots__ = ("picture", "color", "column", "row", "val", "moved", "index", "type_index", "attacks")
 
     # Column and row represent the piece's location in the 2D board array.
-    # Picture is the piece's GUI icon
+    # Picture is the path of the piece's GUI icon, which only the GUI loads
+    # Index is the piece's position in its color's piece list, and type_index its position in the
+    # list of its color's pieces of its type, both kept up to date by engine.Chess
+    # Attacks is the mask of squares the piece attacks, kept up to date by engine.Chess
     def __init__(self, color, column, row, picture):
-        self.picture = pygame.image.load(picture)
+        self.picture = picture
         self.color = color
         self.column = column
         self.row = row
         self.val = 0
         self.moved = False
+        self.index = None
+        self.type_index = None
+        self.attacks = 0
 
     # Can the piece move to a particular square on the board?
     # Each child class has its own implementation of this method.
     def can_move(self, board, column, row):
         return True
 
-    # Draws the piece on the GUI.
-    # Square_size is the size of one square on the GUI board.
-    def draw(self, screen, square_size):
-        x_location = self.row + (self.row * (square_size - 1))
-        y_location = self.column + (self.column * (square_size - 1))
-        self.picture = pygame.transform.scale(self.picture, (square_size, square_size))
-        screen.blit(self.picture, (x_location, y_location))
-        pygame.display.flip()
-
     # Given a location on the GUI board, check if the piece is
     # at that location.
     def intersects_grid(self, grid_size, x, y):
@@ -1,9 +1,55 @@
-from pieces.piece import Piece
+from pieces.piece import Piece, NUM_SQUARES
+
+# Directions a queen moves in, as (column, row) steps: diagonally, and along the rows and columns.
+DIAGONAL_STEPS = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+HORIZONTAL_STEPS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+
+# Returns the rays from each square in the given directions: table[column][row] holds a tuple of
+# squares for each direction, going outwards from the square to the edge of the board.
+def ray_table(steps):
+    table = [[() for row in range(NUM_SQUARES)] for column in range(NUM_SQUARES)]
+    for column in range(NUM_SQUARES):
+        for row in range(NUM_SQUARES):
+            rays = []
+            for column_step, row_step in steps:
+                ray = []
+                i = column + column_step
+                j = row + row_step
+                while 0 <= i < NUM_SQUARES and 0 <= j < NUM_SQUARES:
+                    ray.append((i, j))
+                    i += column_step
+                    j += row_step
+                rays.append(tuple(ray))
+            table[column][row] = tuple(rays)
+    return table
+
+
+# Rays a bishop, rook and queen move along from each square, as DIAGONAL_RAYS[column][row] and so on.
+DIAGONAL_RAYS = ray_table(DIAGONAL_STEPS)
+HORIZONTAL_RAYS = ray_table(HORIZONTAL_STEPS)
+QUEEN_RAYS = ray_table(DIAGONAL_STEPS + HORIZONTAL_STEPS)
+
+
+# Returns the between-squares table: table[column * 8 + row][column * 8 + row] holds the squares
+# strictly between two squares on the same row, column or diagonal, or None if they aren't on one.
+def between_table():
+    table = [[None] * NUM_SQUARES ** 2 for square in range(NUM_SQUARES ** 2)]
+    for column in range(NUM_SQUARES):
+        for row in range(NUM_SQUARES):
+            for ray in QUEEN_RAYS[column][row]:
+                for i, (target_column, target_row) in enumerate(ray):
+                    table[column * NUM_SQUARES + row][target_column * NUM_SQUARES + target_row] = ray[:i]
+    return table
+
+
+BETWEEN = between_table()
 
 
 # Represents a queen piece
 # Rook and Bishop both extend Queen to reuse code for diagonal and horizontal can_move methods
 class Queen(Piece):
+    __slots__ = ()
 
     # Inherited constructor
     # Update the piece value
@@ -14,176 +60,61 @@ class Queen(Piece):
     # The queen is allowed horizontally or diagonally to any unobstructed square
     # that does not currently hold a friendly piece.
     def can_move(self, board, column, row):
-        if self.column == column or self.row == row:
-            return self.check_horizontal(board, column, row)
-        return self.check_diagonal(board, column, row)
+        return self.check_line(board, column, row)
 
     # Is the square diagonal from the queen?
     # Is there a friendly piece in that square?
     # Is there a piece in the way of the queen?
     def check_diagonal(self, board, column, row):
-        distance = abs(self.column - column)
-        if distance != abs(self.row - row) or \
-                (board[column][row] is not None and board[column][row].color == self.color):
+        if abs(self.column - column) != abs(self.row - row):
             return False
-        i = self.column
-        j = self.row
-        while i != column and j != row:
-            if board[i][j] is not None and i != self.column:
-                return False
-            i = i + 1 if i < column else i - 1
-            j = j + 1 if j < row else j - 1
-        return True
+        return self.check_line(board, column, row)
 
     # Is the desired square in the same column or row?
     # Is there a friendly piece on that square?
     # Are there any pieces between this square and that square?
     def check_horizontal(self, board, column, row):
-        if (self.column != column and self.row != row) or \
-                (board[column][row] is not None and board[column][row].color == self.color):
+        if self.column != column and self.row != row:
             return False
-        elif column == self.column:
-            return self.check_rows(board, column, row)
-        return self.check_columns(board, column, row)
-
-    # Checks if the queen can move horizontally to a square in another column.
-    def check_columns(self, board, column, row):
-        if column < self.column:
-            for i in range(column + 1, self.column):
-                if board[i][row] is not None:
-                    return False
-        else:
-            for i in range(self.column + 1, column):
-                if board[i][row] is not None:
-                    return False
-        return True
+        return self.check_line(board, column, row)
 
-    # Checks if the queen can move horizontally to a square in another row.
-    def check_rows(self, board, column, row):
-        if row < self.row:
-            for i in range(row + 1, self.row):
-                if board[column][i] is not None:
-                    return False
-        else:
-            for i in range(self.row + 1, row):
-                if board[column][i] is not None:
-                    return False
+    # Can the queen move along a line to a square? The square must be on the board and on
+    # the same row, column or diagonal, must not hold a friendly piece,
+    # and every square the between-squares table gives on the way must be empty.
+    def check_line(self, board, column, row):
+        if not 0 <= column < NUM_SQUARES or not 0 <= row < NUM_SQUARES:
+            return False
+        between = BETWEEN[self.column * NUM_SQUARES + self.row][column * NUM_SQUARES + row]
+        if between is None or (board[column][row] is not None and board[column][row].color == self.color):
+            return False
+        for i, j in between:
+            if board[i][j] is not None:
+                return False
         return True
 
     # Returns a list of available moves that a piece may make, given a particular board
     def available_moves(self, board):
-        return self.diagonal_moves(board) + self.horizontal_moves(board)
+        return self.ray_moves(board, QUEEN_RAYS[self.column][self.row])
 
     # Returns a list of available diagonal moves that a piece may make, given a particular board
     def diagonal_moves(self, board):
-        return self.diagonal_helper(board, 1, 1) + self.diagonal_helper(board, -1, 1) + \
-               self.diagonal_helper(board, 1, -1) + self.diagonal_helper(board, -1, -1)
-
-    # Helper method to determine available diagonal moves.
-    # Checks each square between the bishop and the end of the board.
-    # Pass column_direction as 1 to move down the board, -1 to move up.
-    # Pass row_direction as 1 to move right, -1 to move left
-    # Stop the iteration when you reach an inaccessible square.
-    # Keep track of hitting enemies to prevent moving past enemy pieces.
-    def diagonal_helper(self, board, column_direction, row_direction):
-        moves = []
-        column = self.column + column_direction
-        row = self.row + row_direction
-        access = True
-        hit_enemy = False
-        while 0 <= column < len(board) and 0 <= row < len(board) and access:
-            if board[column][row] is None:
-                moves.append((column, row))
-            elif board[column][row].color != self.color and not hit_enemy:
-                moves.append((column, row))
-                hit_enemy = True
-            else:
-                access = False
-            column += column_direction
-            row += row_direction
-        return moves
+        return self.ray_moves(board, DIAGONAL_RAYS[self.column][self.row])
 
     # Returns the available horizontal moves that the queen may make.
     def horizontal_moves(self, board):
-        return self.horizontal_right(board) + self.horizontal_left(board) + \
-               self.horizontal_above(board) + self.horizontal_below(board)
-
-    # Helper method to determine available horizontal moves to the right.
-    # Returns a list of squares to the right of the rook that it may move to.
-    # Stop the iteration when you reach an inaccessible square.
-    # Keep track of hitting enemies to prevent moving past enemy pieces.
-    def horizontal_right(self, board):
-        moves = []
-        access = True
-        row = self.row + 1
-        hit_enemy = False
-        while access and row < len(board):
-            if board[self.column][row] is None:
-                moves.append((self.column, row))
-            elif board[self.column][row].color != self.color and not hit_enemy:
-                moves.append((self.column, row))
-                hit_enemy = True
-            else:
-                access = False
-            row += 1
-        return moves
-
-    # Helper method to determine available horizontal moves to the left.
-    # Returns a list of squares to the left of the rook that it may move to.
-    # Stop the iteration when you reach an inaccessible square.
-    # Keep track of hitting enemies to prevent moving past enemy pieces.
-    def horizontal_left(self, board):
-        moves = []
-        access = True
-        row = self.row - 1
-        hit_enemy = False
-        while access and row >= 0:
-            if board[self.column][row] is None:
-                moves.append((self.column, row))
-            elif board[self.column][row].color != self.color and not hit_enemy:
-                moves.append((self.column, row))
-                hit_enemy = True
-            else:
-                access = False
-            row -= 1
-        return moves
-
-    # Helper method to determine available horizontal moves above.
-    # Returns a list of squares above the rook that it may move to.
-    # Stop the iteration when you reach an inaccessible square.
-    # Keep track of hitting enemies to prevent moving past enemy pieces.
-    def horizontal_above(self, board):
-        moves = []
-        access = True
-        column = self.column + 1
-        hit_enemy = False
-        while access and column < len(board):
-            if board[column][self.row] is None:
-                moves.append((column, self.row))
-            elif board[column][self.row].color != self.color and not hit_enemy:
-                moves.append((column, self.row))
-                hit_enemy = True
-            else:
-                access = False
-            column += 1
-        return moves
+        return self.ray_moves(board, HORIZONTAL_RAYS[self.column][self.row])
 
-    # Helper method to determine available horizontal moves below.
-    # Returns a list of squares below the rook that it may move to.
-    # Stop the iteration when you reach an inaccessible square.
-    # Keep track of hitting enemies to prevent moving past enemy pieces.
-    def horizontal_below(self, board):
+    # Walks each ray outwards from the piece, taking every empty square
+    # until it reaches a piece, which it may capture if it is an enemy.
+    def ray_moves(self, board, rays):
         moves = []
-        access = True
-        column = self.column - 1
-        hit_enemy = False
-        while access and column >= 0:
-            if board[column][self.row] is None:
-                moves.append((column, self.row))
-            elif board[column][self.row].color != self.color and not hit_enemy:
-                moves.append((column, self.row))
-                hit_enemy = True
-            else:
-                access = False
-            column -= 1
+        for ray in rays:
+            for column, row in ray:
+                target = board[column][row]
+                if target is None:
+                    moves.append((column, row))
+                else:
+                    if target.color != self.color:
+                        moves.append((column, row))
+                    break
         return moves
@@ -4,6 +4,7 @@ from pieces.queen import Queen
 # Represent a rook piece
 # Inherits from queen to reuse code for horizontal movement checking
 class Rook(Queen):
+    __slots__ = ()
 
     # Inherited constructor
     # Update the piece value
@@ -0,0 +1,96 @@
+import json
+
+from engine import square_name
+
+
+# Statistics on one decision of the ai: what choose_move found and how much searching it took.
+# The search keeps its counters in ai, move_ordering and transposition_table as it goes, so nothing
+# here is touched per node: ai.choose_move fills one of these in once the search is over.
+class SearchStats:
+
+    def __init__(self):
+        self.move = None
+        self.score = None
+        self.depth = 0
+        self.selective_depth = 0
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.evaluations = 0
+        self.seconds = 0.0
+        self.depth_times = []
+        self.depth_nodes = []
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+
+    # Records the result of the search, as returned by ai.iterative_deepening:
+    # the move in UCI notation (None if there is none) and the score, positive when black is ahead.
+    def set_result(self, result):
+        if result is None:
+            return
+        self.score = result[0]
+        if len(result) > 2:
+            piece, (column, row) = result[2][0], result[2][1]
+            self.move = square_name(piece.column, piece.row) + square_name(column, row)
+
+    # Nodes of both the main and quiescence searches visited each second.
+    def nodes_per_second(self):
+        if self.seconds == 0:
+            return 0
+        return int((self.nodes + self.quiescence_nodes) / self.seconds)
+
+    # Effective branching factor: the number of times each completed iteration multiplied the nodes
+    # of the one before, on average. Selective search lowers it so that a search goes deeper.
+    def effective_branching_factor(self):
+        if len(self.depth_nodes) < 2 or self.depth_nodes[0] == 0:
+            return 0.0
+        return (self.depth_nodes[-1] / self.depth_nodes[0]) ** (1 / (len(self.depth_nodes) - 1))
+
+    # Fraction of beta cutoffs caused by the first move searched.
+    def first_move_cutoff_rate(self):
+        if self.cutoffs == 0:
+            return 0.0
+        return self.first_move_cutoffs / self.cutoffs
+
+    # Fraction of transposition table probes that found an entry.
+    def tt_hit_rate(self):
+        if self.tt_probes == 0:
+            return 0.0
+        return self.tt_hits / self.tt_probes
+
+    # Returns the statistics as a dict of plain values, ready to be written as JSON.
+    def to_dict(self):
+        return {
+            "move": self.move,
+            "score": self.score,
+            "depth": self.depth,
+            "selective_depth": self.selective_depth,
+            "nodes": self.nodes,
+            "quiescence_nodes": self.quiescence_nodes,
+            "evaluations": self.evaluations,
+            "seconds": round(self.seconds, 6),
+            "nodes_per_second": self.nodes_per_second(),
+            "depth_times": [round(seconds, 6) for seconds in self.depth_times],
+            "depth_nodes": self.depth_nodes,
+            "effective_branching_factor": round(self.effective_branching_factor(), 4),
+            "cutoffs": self.cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "first_move_cutoff_rate": round(self.first_move_cutoff_rate(), 4),
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_hit_rate": round(self.tt_hit_rate(), 4),
+        }
+
+    # Appends the statistics to a file as one line of JSON.
+    def write(self, path):
+        with open(path, "a") as log:
+            log.write(json.dumps(self.to_dict()) + "\n")
+
+    # Returns a one line summary of the statistics.
+    def report(self):
+        return "search: {} depth {}/{}, {} nodes + {} quiescence nodes in {:.2f}s ({} nps), " \
+               "branching factor {:.2f}, {} cutoffs ({:.1%} on the first move), tt hits {:.1%}".format(
+                self.move, self.depth, self.selective_depth, self.nodes, self.quiescence_nodes, self.seconds,
+                self.nodes_per_second(), self.effective_branching_factor(), self.cutoffs,
+                self.first_move_cutoff_rate(), self.tt_hit_rate())
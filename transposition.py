@@ -0,0 +1,97 @@
+import sys
+
+# Score bound types.
+# EXACT scores are the true value of a position, LOWER_BOUND scores failed high
+# (the true value is at least the score) and UPPER_BOUND scores failed low
+# (the true value is at most the score).
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Replacement policies used when two positions map to the same slot.
+# DEPTH_PREFERRED keeps the deeper search unless the stored entry is from an older search,
+# ALWAYS_REPLACE keeps the most recent search.
+DEPTH_PREFERRED = "depth"
+ALWAYS_REPLACE = "always"
+
+DEFAULT_MEGABYTES = 16
+
+
+# Approximate memory taken by one stored entry: the entry tuple, its 64 bit key, score and move,
+# plus the list slot pointing at it.
+def entry_size():
+    key = (1 << 64) - 1
+    score = 0.5
+    move = (0, 0, 0, 0)
+    entry = (key, 0, score, EXACT, move, 0)
+    return sys.getsizeof(entry) + sys.getsizeof(key) + sys.getsizeof(score) + sys.getsizeof(move) + 8
+
+
+ENTRY_SIZE = entry_size()
+
+
+# A fixed size hash table of search results keyed by Zobrist key.
+# Each entry is a (key, depth, score, bound type, best move, generation) tuple.
+# The number of slots is derived from a memory cap, so the table never grows during a game.
+class TranspositionTable:
+
+    def __init__(self, megabytes=DEFAULT_MEGABYTES, replacement=DEPTH_PREFERRED):
+        self.size = max(1, int(megabytes * 1024 * 1024) // ENTRY_SIZE)
+        self.entries = [None] * self.size
+        self.replacement = replacement
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    # Returns the entry stored for a key, or None if there is none.
+    def probe(self, key):
+        self.probes += 1
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    # Stores a search result, following the table's replacement policy if the slot is taken.
+    # Move is the best move found, in whatever compact form the search uses.
+    def store(self, key, depth, score, bound, move):
+        index = key % self.size
+        entry = self.entries[index]
+        if entry is not None and entry[0] != key:
+            if self.replacement == DEPTH_PREFERRED and entry[5] == self.generation and entry[1] > depth:
+                return
+            self.overwrites += 1
+        self.entries[index] = (key, depth, score, bound, move, self.generation)
+        self.stores += 1
+
+    # Called at the start of each search so that entries from older searches are replaced first.
+    def new_search(self):
+        self.generation += 1
+
+    # Empties the table and resets its counters.
+    def clear(self):
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.reset_counters()
+
+    # Resets the hit/miss counters, leaving the stored entries in place.
+    def reset_counters(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    # Fraction of probes that found an entry for their key.
+    def hit_rate(self):
+        if self.probes == 0:
+            return 0.0
+        return self.hits / self.probes
+
+    # Returns a one line summary of the table's usage.
+    def report(self):
+        filled = self.size - self.entries.count(None)
+        return "tt: {} probes, {} hits ({:.1%}), {} misses, {} stores, {} overwrites, {}/{} slots used".format(
+            self.probes, self.hits, self.hit_rate(), self.probes - self.hits, self.stores, self.overwrites,
+            filled, self.size)
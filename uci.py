@@ -0,0 +1,219 @@
+import sys
+import threading
+import time
+
+import ai
+import engine
+from pieces.pawn import Pawn
+from pieces.piece import Color
+
+NUM_SQUARES = 8
+
+# Moves assumed to be left in the game when go gives the clock but not movestogo.
+DEFAULT_MOVES_TO_GO = 30
+
+# The position the next go searches.
+game = engine.Chess()
+
+# Thread running the search started by go, and the event stop sets to interrupt it.
+search_thread = None
+stop_event = threading.Event()
+search_start = 0.0
+
+# Set while a "go ponder" search runs on the opponent's time, so that it ignores its time limit
+# (see ai.check_budget), until ponderhit clears it. Ponder_over is set once ponderhit or stop has
+# been sent, or straight away when the search isn't pondering.
+ponder_event = threading.Event()
+ponder_over = threading.Event()
+
+# Keeps lines written by the search thread and the command loop from interleaving.
+output_lock = threading.Lock()
+
+
+# Writes a line to the GUI driving the engine.
+def send(line):
+    with output_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+# Returns a move of the game in UCI notation, such as "e2e4" or "e7e8q".
+# Call it before the move is made, while the piece is still on its square.
+def move_name(move):
+    piece, (column, row) = move[0], move[1]
+    name = engine.square_name(piece.column, piece.row) + engine.square_name(column, row)
+    if isinstance(piece, Pawn) and (column == 0 or column == NUM_SQUARES - 1):
+        promotion = move[2] if len(move) > 2 else engine.PROMOTIONS[0]
+        name += engine.PIECE_LETTERS[promotion]
+    return name
+
+
+# Turns a move in UCI notation into a move of the game: (piece, (column, row)), or
+# (piece, (column, row), piece_class) when a pawn promotes to anything but a queen.
+def parse_move(position, name):
+    column, row = engine.parse_square(name[0:2])
+    move = position.board[column][row], engine.parse_square(name[2:4])
+    if len(name) > 4 and engine.PIECE_CLASSES[name[4]] is not engine.PROMOTIONS[0]:
+        move += (engine.PIECE_CLASSES[name[4]],)
+    return move
+
+
+# Returns the UCI names of a line of moves played from the position.
+def line_names(position, line):
+    names = []
+    for move in line:
+        names.append(move_name(move))
+        position.make_move(move)
+    for move in line:
+        position.unmake_move()
+    return names
+
+
+# Seconds to think about a move with time_left milliseconds on the clock, gaining
+# increment milliseconds per move, with moves_to_go moves to play before the next time control.
+def time_for_move(time_left, increment, moves_to_go):
+    budget = time_left / (moves_to_go or DEFAULT_MOVES_TO_GO) + increment
+    return max(1, min(budget, time_left / 2)) / 1000
+
+
+# Called by the search as each iteration completes: sends an info line with the
+# depth, score (for the side to move), nodes, nodes per second, time and pv.
+# Nodes counts the quiescence search's nodes as well as the main search's.
+def report_iteration(depth, result):
+    elapsed = max(time.time() - search_start, 1e-6)
+    score = result[0] if game.turn == Color.BLACK else -result[0]
+    pv = line_names(game, result[3]) if len(result) > 3 else []
+    nodes = ai.nodes_searched + ai.quiescence_nodes
+    line = "info depth {} score {} nodes {} nps {} time {}".format(
+        depth, score_name(score, depth), nodes, int(nodes / elapsed), int(elapsed * 1000))
+    if pv:
+        line += " pv " + " ".join(pv)
+    send(line)
+
+
+# Returns a score in UCI notation: "cp" and centipawns, or "mate" and the moves to checkmate
+# (negative when the side to move is the one mated). The search scores a checkmate
+# ai.MATE_SCORE plus the depth left when it was found.
+def score_name(score, depth):
+    if abs(score) < ai.MATE_SCORE:
+        return "cp {}".format(round(score * 100))
+    plies = depth - (abs(score) - ai.MATE_SCORE)
+    return "mate {}".format((plies + 1) // 2 if score > 0 else -(plies // 2))
+
+
+# Runs in search_thread: searches the game and sends the best move.
+# If stop interrupts the first iteration, the first legal move is sent instead.
+# The protocol doesn't allow bestmove before stop in an infinite search, or before ponderhit
+# or stop while pondering, so a search that finishes early waits for them.
+def run_search(depth, time_limit, node_limit, infinite):
+    result = ai.choose_move(game, depth, time_limit=time_limit, node_limit=node_limit,
+                            stop=stop_event, report=report_iteration, ponder=ponder_event)[0]
+    if infinite:
+        stop_event.wait()
+    ponder_over.wait()
+    if result is not None and len(result) > 2:
+        send("bestmove " + move_name(result[2]))
+    else:
+        moves = game.legal_moves(game.turn)
+        send("bestmove " + (move_name(moves[0]) if moves else "0000"))
+
+
+# Interrupts the search if one is running and waits for it to send its best move.
+def stop_search():
+    global search_thread
+    if search_thread is not None:
+        stop_event.set()
+        ponder_over.set()
+        search_thread.join()
+        search_thread = None
+
+
+# position [startpos | fen <fen>] [moves <move> ...]
+def position_command(words):
+    global game
+    if "moves" in words:
+        moves = words[words.index("moves") + 1:]
+        words = words[:words.index("moves")]
+    else:
+        moves = []
+    if words[1] == "fen":
+        game = engine.Chess.from_fen(" ".join(words[2:]))
+    else:
+        game = engine.Chess.from_fen(engine.START_FEN)
+    for name in moves:
+        game.make_move(parse_move(game, name))
+    game.history = []
+
+
+# go [depth <plies>] [movetime <ms>] [nodes <n>] [wtime <ms>] [btime <ms>] [winc <ms>] [binc <ms>]
+#    [movestogo <n>] [infinite] [ponder]
+def go_command(words):
+    global search_thread, search_start
+    options = {}
+    for i in range(1, len(words) - 1):
+        if words[i + 1].lstrip("-").isdigit():
+            options[words[i]] = int(words[i + 1])
+    depth = options.get("depth", ai.MAX_DEPTH)
+    time_limit = None
+    if "movetime" in options:
+        time_limit = options["movetime"] / 1000
+    elif "infinite" not in words:
+        clock, increment = ("wtime", "winc") if game.turn == Color.WHITE else ("btime", "binc")
+        if clock in options:
+            time_limit = time_for_move(options[clock], options.get(increment, 0), options.get("movestogo"))
+    stop_search()
+    stop_event.clear()
+    if "ponder" in words:
+        ponder_event.set()
+        ponder_over.clear()
+    else:
+        ponder_event.clear()
+        ponder_over.set()
+    search_start = time.time()
+    search_thread = threading.Thread(target=run_search, daemon=True,
+                                     args=(depth, time_limit, options.get("nodes"), "infinite" in words))
+    search_thread.start()
+
+
+# Handles one command, given as a list of words. Returns False once the engine should quit.
+def handle(words):
+    global game
+    command = words[0]
+    if command == "uci":
+        send("id name Chess")
+        send("id author retropleinad")
+        send("uciok")
+    elif command == "isready":
+        send("readyok")
+    elif command == "ucinewgame":
+        stop_search()
+        ai.transposition_table.clear()
+        game = engine.Chess()
+    elif command == "position":
+        stop_search()
+        position_command(words)
+    elif command == "go":
+        go_command(words)
+    elif command == "ponderhit":
+        # The opponent played the move pondered on: the search carries on against its time limit
+        ponder_event.clear()
+        ponder_over.set()
+    elif command == "stop":
+        stop_search()
+    elif command == "quit":
+        stop_search()
+        return False
+    return True
+
+
+# Reads UCI commands from standard input until quit or the end of input.
+def main():
+    for line in sys.stdin:
+        words = line.split()
+        if words and not handle(words):
+            break
+    stop_search()
+
+
+if __name__ == '__main__':
+    main()
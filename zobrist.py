@@ -0,0 +1,40 @@
+import random
+
+from pieces.bishop import Bishop
+from pieces.king import King
+from pieces.knight import Knight
+from pieces.pawn import Pawn
+from pieces.piece import Color
+from pieces.queen import Queen
+from pieces.rook import Rook
+
+NUM_SQUARES = 8
+
+# Keys are drawn from a fixed seed so that a position hashes to the same key on every run.
+generator = random.Random(1998)
+
+
+# Returns a random 64 bit key.
+def random_key():
+    return generator.getrandbits(64)
+
+
+# One key per color, piece class and square.
+# Squares are numbered column by column: board[column][row] is square column * 8 + row.
+PIECE_KEYS = {color: {piece_class: [random_key() for sq in range(NUM_SQUARES * NUM_SQUARES)]
+                      for piece_class in (Pawn, Knight, Bishop, Rook, Queen, King)}
+              for color in (Color.WHITE, Color.BLACK)}
+
+# Toggled whenever it is black's turn to move.
+SIDE_KEY = random_key()
+
+# One key per color for each castling side: index 0 is the king's side, index 1 the queen's side.
+CASTLING_KEYS = {color: [random_key(), random_key()] for color in (Color.WHITE, Color.BLACK)}
+
+# One key per row a pawn that may be captured en passant can stand on.
+EN_PASSANT_KEYS = [random_key() for row in range(NUM_SQUARES)]
+
+
+# Returns the key of a piece standing on a particular square.
+def piece_key(piece, column, row):
+    return PIECE_KEYS[piece.color][type(piece)][column * NUM_SQUARES + row]